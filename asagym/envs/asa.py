@@ -1,29 +1,38 @@
+import asyncio
 import json
 import os
 import os.path
 import pathlib
-import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 from datetime import datetime
-from subprocess import Popen, DEVNULL
-from typing import Dict, List, Optional, Tuple
+from subprocess import Popen
+from typing import Dict, Generator, Iterator, List, Optional, Sequence, Tuple
 from logging import Logger
 
 import gymnasium as gym
 import numpy as np
 import pygame
 import zmq
-from gymnasium.spaces import Space
+from gymnasium.spaces import Box, Space, flatten, flatten_space
 
 import asagym.proto.simulator_pb2 as pb
-from asagym.utils.communication import (
-    recv_message_from_simulation,
-    send_message_to_simulation,
-)
+from asagym.utils.cache import StateCache
+from asagym.utils.codec import StateCodec
 from asagym.utils.drawing import SCREEN_HEIGHT, SCREEN_WIDTH
+from asagym.utils.endpoints import EndpointAllocator
 from asagym.utils.logger import new_logger
-from asagym.utils.preprocessing import merge_observations
+from asagym.utils.packing import StateColumns
+from asagym.utils.preprocessing import TeamTable
 from asagym.utils.simulation import Simulation
+from asagym.utils.simulator import (
+    CLOSE_TIMEOUT,
+    STANDBY_ID_STRIDE,
+    SimulatorFailure,
+    SimulatorInstance,
+    StandbyPool,
+)
+from asagym.utils.subscription import BASE_STATE_FIELDS, build_state_mask
 
 
 class BaseAsaEnv(gym.Env, ABC):
@@ -31,6 +40,20 @@ class BaseAsaEnv(gym.Env, ABC):
 
     metadata = {"render_modes": ["rgb_array"], "render_fps": 160}
 
+    # the State fields read by the subclass (None means all of them)
+    STATE_FIELDS: Optional[Tuple[str, ...]] = None
+
+    # the State message read by each key of the Dict observation, if the
+    # subclass observes through a StateCodec (see _codec_observation)
+    OBSERVATION_SOURCES: Optional[Dict[str, str]] = None
+
+    # the observation modes supported by the subclass (see observation_mode)
+    OBSERVATION_MODES: Tuple[str, ...] = ("dict", "flat")
+
+    # whether the subclass reads the teams (see teams) after every step, and
+    # not only on reset
+    TRACK_TEAMS: bool = False
+
     def __init__(
         self,
         simu_path: pathlib.Path,
@@ -41,6 +64,26 @@ class BaseAsaEnv(gym.Env, ABC):
         rank: int = 0,
         use_docker: bool = False,
         log_level: str = "INFO",
+        ticks_per_step: int = 1,
+        warm_reset: bool = False,
+        standby_instances: int = 0,
+        wire_format: pb.WireFormat = pb.ONEOF,
+        endpoint: Optional[str] = None,
+        allocate_endpoint: bool = False,
+        packed_states: bool = False,
+        delta_states: bool = False,
+        field_mask: bool = False,
+        reward_fields: Sequence[str] = (),
+        reuse_actions: bool = False,
+        autoreset: bool = False,
+        session: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        init_timeout: Optional[float] = None,
+        respawn_attempts: int = 3,
+        close_timeout: float = CLOSE_TIMEOUT,
+        observation_mode: str = "dict",
+        observation_dtype: np.dtype = np.float64,
+        track_teams: bool = False,
     ):
         if not base_path.exists():
             raise OSError(f"File {base_path.absolute()} does not exist")
@@ -62,6 +105,45 @@ class BaseAsaEnv(gym.Env, ABC):
 
         # execution modes
         self.use_docker = use_docker
+        self.wire_format = wire_format  # proposed to the simulator on Init
+        self.endpoint = endpoint  # "tcp", "ipc" or a zmq endpoint url
+        self.warm_reset = warm_reset  # reuse the simulator process across episodes
+        self.packed_states = packed_states  # ask for the states as NumPy columns
+        self.delta_states = delta_states  # ask only for the changes of the states
+        self.reuse_actions = reuse_actions  # fill the same pb.Actions on every step
+        self.autoreset = autoreset  # reset in background once an episode ends
+        self.session = session  # of a simulator shared with other envs (SessionHost)
+
+        # the watchdog: seconds to wait for each reply (forever if None) and for
+        # the Init one (request_timeout if None), and how many times a reset
+        # replaces a failed simulator before giving up
+        self.request_timeout = request_timeout
+        self.init_timeout = init_timeout
+        self.respawn_attempts = respawn_attempts
+        # seconds given to the simulator to reply Close and exit before being
+        # terminated (see SimulatorInstance.stop)
+        self.close_timeout = close_timeout
+
+        if session is not None and (endpoint is None or allocate_endpoint):
+            raise ValueError("sessions require the endpoint of their SessionHost")
+        if session is not None and standby_instances > 0:
+            raise ValueError("standby instances are not supported with sessions")
+        if standby_instances > 0:
+            # checked before claiming any endpoint
+            fixed = endpoint not in (None, "tcp", "ipc") and "{id}" not in endpoint
+            if fixed and not allocate_endpoint:
+                raise ValueError("standby instances require an endpoint with '{id}'")
+            if not 0 <= rank < STANDBY_ID_STRIDE:
+                raise ValueError(
+                    f"standby instances require a rank below {STANDBY_ID_STRIDE}"
+                )
+
+        # subscribe only to the State fields read by the env and its reward
+        self._state_mask = None
+        if field_mask and self.STATE_FIELDS is not None:
+            self._state_mask = build_state_mask(
+                BASE_STATE_FIELDS + self.STATE_FIELDS + tuple(reward_fields)
+            )
         self.base_path = base_path
 
         # render settings
@@ -77,10 +159,63 @@ class BaseAsaEnv(gym.Env, ABC):
         self.own_id = 0  # the id of the player being controlled
         self.episode_counter = 0  # how many episodes have been run
         self.step_counter = 0  # how many steps have been run in a episode
+        self.ticks_per_step = ticks_per_step  # simulator ticks per agent decision
+
+        # the reset started by the last (terminal) step, if autoreset is set
+        self._autoreset_flow: Optional[Generator[None, None, tuple]] = None
+
+        # the standby simulator awaited by the flow in progress, instead of a
+        # reply on the socket (see _swap_standby)
+        self._awaited_standby: Optional[Future] = None
+
+        # the step in flight (see step_send and step_recv)
+        self._sim_action: List[pb.Action] = []
+        self._step_ticks = 0
+        self._step_reward = 0.0
+
+        # the last observation and info, returned again if the simulator fails
+        self._last_observation = None
+        self._last_info: Optional[Dict] = None
+        # the states of the last tick (see last_states)
+        self._last_state: Optional[List[pb.State]] = None
+
+        # the last known states of both teams, updated on every tick only if
+        # read by the subclass, the renderer or the user (track_teams), and
+        # otherwise from the last tick, on access (see teams)
+        self._teams = TeamTable()
+        self._teams_states: Optional[Sequence[pb.State]] = None
+        self.track_teams = (
+            track_teams or self.TRACK_TEAMS or self.render_mode is not None
+        )
+
+        # the actions filled by get_action (reused if reuse_actions is set)
+        self._actions: List[pb.Action] = []
 
-        self.node = None
+        # the last states received as columns (if supported by the simulator)
+        self.packed: Optional[StateColumns] = None
 
-        self._summary = pb.Summary()
+        # the states rebuilt from the deltas (if supported by the simulator)
+        self._cache: Optional[StateCache] = None
+
+        # the observations as a single vector (flat) or as the nested Dict
+        if observation_mode not in self.OBSERVATION_MODES:
+            raise ValueError(f"Unknown observation mode: {observation_mode}")
+        self.observation_mode = observation_mode
+        self.dict_observation_space = observation_space
+        # the space whose flattening has the layout of the flat observation (its
+        # leaves name the entries of the vector, see FeatureObservation)
+        self.flat_layout_space = observation_space
+
+        self._codec: Optional[StateCodec] = None
+        if self.OBSERVATION_SOURCES is not None:
+            self._codec = StateCodec(
+                observation_space, self.OBSERVATION_SOURCES, observation_dtype
+            )
+        if observation_mode == "flat":
+            if self._codec is not None:
+                observation_space = self._codec.flat_space
+            elif not isinstance(observation_space, Box):
+                observation_space = flatten_space(observation_space)
 
         # gymnasium environment variables
         self._logger.debug(f"ASA env with Obervation Space: {observation_space}")
@@ -88,39 +223,145 @@ class BaseAsaEnv(gym.Env, ABC):
         self.observation_space = observation_space
         self.action_space = action_space
 
+        # claiming endpoints not used by any other job of this machine
+        self._allocator = None
+        if allocate_endpoint:
+            self._allocator = EndpointAllocator(base_path, transport=endpoint or "tcp")
+
         # stablishing communication with the underlying simulator
         self.context = zmq.Context()
-        url = "127.0.0.1:" + str(8000 + self.rank)
-        self.socket = self.context.socket(zmq.REQ)
-        self.socket.connect("tcp://" + url)
+        self._instance = self._new_instance(self.rank)
+
+        # pre-initialized simulators (started in background) to swap on reset
+        self._standby = None
+        if standby_instances > 0:
+            self._standby = StandbyPool(
+                size=standby_instances,
+                rank=self.rank,
+                factory=self._new_instance,
+                logger=self._logger,
+            )
 
     @property
     def logger(self) -> Logger:
         return self._logger
 
     @property
-    def summary(self):
-        return self._summary
+    def teams(self) -> TeamTable:
+        """The last known states of both teams.
+
+        Updated on every tick if `track_teams` is set (or if the subclass or
+        the renderer need it). Otherwise, it is only updated on access, from
+        the last tick: the players missing from that tick keep the states of
+        an earlier access (or of the reset).
+        """
+        if self._teams_states is not None:
+            self._teams.update(self._teams_states)
+            self._teams_states = None
+        return self._teams
 
-    def reset(self, *, seed: int = None, options: Optional[dict] = None) -> tuple:
-        super().reset(seed=seed, options=options)
+    @property
+    def last_states(self) -> Optional[List[pb.State]]:
+        """The States of the last tick, of the reset or of the last step.
 
-        if self.node is not None:
-            # attempt clean shutdown underlying simulator
-            # the reset method should be idempotent
-            self._close_simulation()
+        Rebuilt from the deltas if `delta_states` is set, in which case they are
+        updated in place by the next step. With `packed_states`, the fields of
+        the schema are in `packed` instead.
+        """
+        return self._last_state
 
-        # starts the underlying simulator
-        num_players, init_data = self.reset_init()
+    @property
+    def summary(self) -> pb.Summary:
+        """The teams as a Summary, built on each access (see teams)."""
+        return self.teams.to_summary()
+
+    @property
+    def node(self) -> Optional[Popen]:
+        return self._instance.node
+
+    @property
+    def awaited_standby(self) -> Optional[Future]:
+        """The standby simulator awaited by the reset in progress, if any.
 
-        self._initialize_simulation(num_players)
+        The reset (or autoreset) flow then yields until it is ready, rather
+        than for a reply on `socket`.
+        """
+        return self._awaited_standby
 
-        self._summary = pb.Summary()
-        states = self._reset_simulation(init_data)
-        self._summary = merge_observations(states, self._summary)
+    @property
+    def socket(self) -> zmq.Socket:
+        return self._instance.socket
+
+    @property
+    def simulator(self) -> SimulatorInstance:
+        return self._instance
+
+    @property
+    def uuid(self):
+        return self._instance.uuid
+
+    def reset(self, *, seed: int = None, options: Optional[dict] = None) -> tuple:
+        # the replies are received as soon as the flow resumes
+        flow = self.reset_flow(seed=seed, options=options)
+        try:
+            while True:
+                next(flow)
+        except StopIteration as stop:
+            return stop.value
+
+    async def areset(
+        self, *, seed: int = None, options: Optional[dict] = None
+    ) -> tuple:
+        """Same as `reset`, but awaiting the replies without blocking the event loop."""
+        flow = self.reset_flow(seed=seed, options=options)
+        try:
+            while True:
+                next(flow)
+                await self._wait_flow()
+        except StopIteration as stop:
+            return stop.value
+
+    def reset_flow(
+        self, *, seed: int = None, options: Optional[dict] = None
+    ) -> Generator[None, None, tuple]:
+        """The steps of `reset`, returning the observation and info.
+
+        Yields whenever a reply must be awaited on `socket` (or a standby
+        simulator, see `awaited_standby`), so that many environments can be
+        reset at once.
+        """
+        if self._autoreset_flow is not None:
+            # the episode is already being reset (see autoreset)
+            flow, self._autoreset_flow = self._autoreset_flow, None
+            yield
+            observation, info = yield from flow
+            if seed is None and options is None:
+                return observation, info
+
+        super().reset(seed=seed, options=options)
+
+        num_players, init_data = self.reset_init()
+        scenario = self._scenario_key(num_players)
+
+        attempt = 0
+        while True:
+            try:
+                states = yield from self._start_episode(
+                    num_players, scenario, init_data
+                )
+                break
+            except (SimulatorFailure, TimeoutError) as e:
+                if attempt >= self.respawn_attempts:
+                    raise
+                attempt += 1
+                self._logger.warning(f"Respawning the simulator ({e})")
+                self._instance.reap()
+
+        self._teams.update(states)
+        self._last_state = states
 
         if self.render_mode is not None:
-            self._graphics.reset(self._summary)
+            self._graphics.reset(self.teams)
 
         self._save_recording()
 
@@ -133,129 +374,428 @@ class BaseAsaEnv(gym.Env, ABC):
         # a callback to be used to reset/initialize subclasses
         self.reset_callback(states)
 
-        observation = self.get_obs(states)
+        observation = self._observe(states)
         info = self.get_info(states)
 
+        self._last_observation, self._last_info = observation, info
         return observation, info
 
-    def _initialize_simulation(self, num_players: int):
-        # loading scenario edl file
-        self._logger.info(f"Using scenario: {self.simu_path.absolute()}")
-        with open(self.simu_path, "r") as file:
-            scenario = file.read()
-
-        exec_uuid = uuid.uuid4()
-
-        # Store execution uuid
-        self.uuid = exec_uuid
-
-        scenario = scenario.replace("!EXEC_UUID!", str(exec_uuid))
-
-        # running the underlying simulator process
-        if self.use_docker:
-            # inside docker
-            self.node = Popen(
-                f"docker run -it -v {self.base_path}:/home/asa/workspace -p {50051 + self.rank}:50051 hub.asa.dcta.mil.br/asa/gym:latest ./AsaGym --id={self.rank}",
-                shell=True,
-            )
-        else:
-            # or as a regular process
-            cwd_path = self.base_path.joinpath("./bin")
-            exe_path = self.base_path.joinpath("./bin/AsaWrapper.sh")
-
-            data_path = self.base_path.joinpath(
-                f"./var/data/executions/{exec_uuid}/gym.log"
-            )
+    def _start_episode(
+        self, num_players: int, scenario: tuple, init_data: Optional[Dict]
+    ) -> Generator[None, None, List[pb.State]]:
+        # the part of reset_flow talking to the simulator, retried on failures
+        if self._instance.running and not self._can_warm_reset(scenario):
+            # attempt clean shutdown underlying simulator, awaiting its Close
+            # reply as any other (the terminal step of autoreset returns first)
+            # the reset method should be idempotent
+            yield from self._instance.stop_flow(self.close_timeout)
+            self._save_recording()
+
+        if not self._instance.running:
+            # starts the underlying simulator (or swap to a standby one)
+            if not (yield from self._swap_standby(scenario)):
+                self._initialize_simulation(num_players, scenario)
+        elif not self._instance.fresh:
+            sim_id = self._instance.sim_id
+            self._logger.info(f"Reusing simulation instance #{sim_id}")
+
+        if self._instance.starting:
+            yield
+            # receive the Init reply
+            self._instance.wait_ready(self._instance.init_timeout)
+        self._instance.fresh = False
+
+        if self._standby is not None:
+            # prepare the simulators of the next episodes while this one runs
+            self._standby.fill(self._read_scenario(), num_players, scenario)
+
+        self._teams.clear()
+        self._teams_states = None
+        self._send_reset(init_data)
+        yield
+        return self._recv_reset()
+
+    def start_simulation(self) -> None:
+        """Spawns the simulator of the next episode, without waiting for it.
+
+        Does nothing if a simulator is already running. The next `reset` uses
+        this one (after `wait_simulation`, or waiting for it itself), so that
+        many simulators can be started at once (see `start_fleet`).
+        """
+        if self._instance.running:
+            return
+
+        num_players, _ = self.reset_init()
+        self._initialize_simulation(num_players, self._scenario_key(num_players))
+
+    def wait_simulation(self, timeout: Optional[float] = None) -> float:
+        """Waits for the simulator started by `start_simulation` to be ready.
+
+        Returns its cold-start time in seconds. If it is not ready `timeout`
+        seconds after its start, it is killed and a TimeoutError is raised (or
+        a RuntimeError, if it has exited).
+        """
+        if not self._instance.running:
+            raise RuntimeError("The simulator has not been started")
+
+        if self._instance.starting:
+            try:
+                self._instance.wait_ready(timeout)
+            except (RuntimeError, TimeoutError):
+                # the next reset starts a new simulator
+                self._close_simulation()
+                raise
+        return self._instance.cold_start
+
+    def check_simulation(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[Optional[float], Optional[str]]:
+        """Same as `wait_simulation`, returning the error rather than raising it.
+
+        Returns the cold-start time and None, or None and the reason of the
+        failure, so that the workers of a vectorized env survive it (see
+        AsaVecEnv.start_simulators).
+        """
+        try:
+            return self.wait_simulation(timeout), None
+        except (RuntimeError, TimeoutError) as e:
+            return None, str(e)
+
+    def _scenario_key(self, num_players: int) -> tuple:
+        # a change on any of these requires a fresh simulator process
+        scenario_path = self.simu_path.absolute()
+        return (scenario_path, scenario_path.stat().st_mtime_ns, num_players)
+
+    def _can_warm_reset(self, scenario: tuple) -> bool:
+        # a fresh simulator (see start_simulation) has not run any episode yet
+        return (
+            (self.warm_reset or self._instance.fresh)
+            and self._instance.alive
+            and self._instance.scenario == scenario
+        )
 
-            env = os.environ.copy()
-            self.node = Popen(
-                [
-                    "bash",
-                    exe_path,
-                    "./AsaGym",
-                    f"--id={self.rank}",
-                    f"--uuid={exec_uuid}",
-                ],
-                stdout=DEVNULL,  # TODO: pipe this to somewhere
-                stderr=DEVNULL,  # TODO: pipe this to somewhere
-                cwd=cwd_path,
-                env=env,
-                shell=False,
-            )
+    def _new_instance(self, sim_id: int) -> SimulatorInstance:
+        return SimulatorInstance(
+            context=self.context,
+            base_path=self.base_path,
+            sim_id=sim_id,
+            use_docker=self.use_docker,
+            logger=self._logger,
+            wire_format=self.wire_format,
+            endpoint=self.endpoint,
+            allocator=self._allocator,
+            packed_states=self.packed_states,
+            delta_states=self.delta_states,
+            state_mask=self._state_mask,
+            session=self.session,
+            request_timeout=self.request_timeout,
+            init_timeout=self.init_timeout,
+        )
 
-        self._logger.info(f"Spawning simulation instance #{self.rank}")
+    def _swap_standby(self, scenario: tuple) -> Generator[None, None, bool]:
+        if self._standby is None:
+            return False
+
+        # the standby simulators still being prepared are awaited at yields
+        flow = self._standby.take_flow(scenario)
+        try:
+            while True:
+                self._awaited_standby = next(flow)
+                yield
+        except StopIteration as stop:
+            instance = stop.value
+        finally:
+            self._awaited_standby = None
+        if instance is None:
+            return False
+
+        # the current (already stopped) instance gives its id back to the pool
+        self._standby.release(self._instance)
+        self._instance = instance
+        return True
+
+    def _read_scenario(self) -> str:
+        # loading scenario edl file
+        with open(self.simu_path, "r") as file:
+            return file.read()
 
-        # sending the Init request
-        request = pb.InitRequest()
-        request.edl = scenario
-        request.num_players = num_players
-        send_message_to_simulation(self.socket, request)
-        # receive the Init reply
-        _ = recv_message_from_simulation(self.socket, pb.INIT)
+    def _initialize_simulation(self, num_players: int, scenario: tuple):
+        self._logger.info(f"Using scenario: {self.simu_path.absolute()}")
+        self._instance.start(self._read_scenario(), num_players, scenario)
 
-    def _reset_simulation(self, options: Optional[dict]) -> List[pb.State]:
+    def _send_reset(self, options: Optional[dict]) -> None:
         # sending the Reset request
         request = pb.ResetRequest()
 
         if options is not None:
             request.data = json.dumps(options)
 
-        send_message_to_simulation(self.socket, request)
+        self._instance.send(request)
+
+    def _recv_reset(self) -> List[pb.State]:
         # receive the Reset reply
-        reply = recv_message_from_simulation(self.socket, pb.RESET)
+        reply = self._instance.recv(pb.RESET)
+
+        # the schema may change along with the simulator instance
+        schema = self._instance.schema
+        self.packed = StateColumns(schema) if schema is not None else None
+        if self.packed is not None:
+            self.packed.decode(reply.packed)
+
+        # the deltas of the episode are relative to these states
+        self._cache = StateCache() if self._instance.delta else None
+        if self._cache is not None:
+            self._cache.load(reply.states, reply.sequence)
+            return self._cache.states
+
         return reply.states
 
+    def _sync_simulation(self) -> None:
+        # sending the Sync request
+        self._instance.send(pb.SyncRequest())
+        # receive the Sync reply
+        reply = self._instance.recv(pb.SYNC)
+        self._cache.load(reply.states, reply.sequence)
+
     def step(self, action) -> tuple:
+        self.step_send(action)
+
+        # legacy simulators take a request per tick
+        transition = None
+        while transition is None:
+            transition = self.step_recv()
+        return transition
+
+    async def astep(self, action) -> tuple:
+        """Same as `step`, but awaiting the replies without blocking the event loop."""
+        self.step_send(action)
+
+        transition = None
+        while transition is None:
+            await self._wait_flow()
+            transition = self.step_recv()
+        return transition
+
+    async def _wait_flow(self) -> None:
+        # what the flow in progress awaits, without blocking the event loop
+        if self._awaited_standby is not None:
+            await asyncio.wait([asyncio.wrap_future(self._awaited_standby)])
+        else:
+            await self._instance.wait_readable()
+
+    def step_send(self, action) -> None:
+        """Sends the Step request of an action, without waiting for the reply.
+
+        Along with `step_recv`, this allows to step many environments at once.
+        """
+        if self._autoreset_flow is not None:
+            # the action is dropped, the simulator is being reset
+            return
+
         # incrementing step counter
         self.step_counter += 1
 
         # high level action => low level action
-        sim_action = self.get_action(action)
-
-        # forwards the step to the simulator
-        sim_state = self._step_simulation(sim_action)
-        self._summary = merge_observations(sim_state, self._summary)
-
-        if self.render_mode is not None:
-            self._graphics.update(self._summary)
+        self._sim_action = self.get_action(action)
+        self._step_ticks = 0
+        self._step_reward = 0.0
+
+        # the simulator may simulate all the ticks of this step at once
+        self._send_step(self._sim_action, self.ticks_per_step)
+
+    def step_recv(self) -> Optional[tuple]:
+        """Receives the Step reply, returning the transition of the step.
+
+        Returns None if the simulator simulated fewer ticks than required, in
+        which case the Step request of the remaining ticks is sent.
+
+        If the simulator ends the episode (`done`) while get_termination does
+        not, the episode is truncated.
+
+        With autoreset, the step following a terminal one returns the first
+        observation of the new episode (with a zero reward).
+
+        If the simulator fails (see `request_timeout`), the episode is truncated
+        with the last observation and a "simulator_failure" info, and the next
+        reset spawns a new simulator.
+        """
+        if self._autoreset_flow is not None:
+            return self._resume_autoreset()
+
+        try:
+            frames, num_ticks, done = self._recv_step()
+            self._step_ticks += num_ticks
+
+            # the reward is accumulated over every simulated tick
+            terminated = False
+            for sim_state in frames:
+                if self.track_teams:
+                    self._teams.update(sim_state)
+                else:
+                    self._teams_states = sim_state
+
+                if self.render_mode is not None:
+                    self._graphics.update(self.teams)
+
+                terminated = self.get_termination(sim_state)
+                self._step_reward += self.get_reward(sim_state, terminated)
+                if terminated:
+                    break
+        except SimulatorFailure as e:
+            return self._interrupt_episode(e)
+
+        if self._step_ticks < self.ticks_per_step and not (terminated or done):
+            self._send_step(self._sim_action, self.ticks_per_step - self._step_ticks)
+            return None
 
         # low level state => high level observations
-        observation = self.get_obs(sim_state)
-        terminated = self.get_termination(sim_state)
-        reward = self.get_reward(sim_state, terminated)
+        observation = self._observe(sim_state)
         info = self.get_info(sim_state)
 
         self._last_state = sim_state
+        self._last_observation, self._last_info = observation, info
+
+        # the simulator ended the episode without the env terminating it, no
+        # more steps can be simulated
+        truncated = done and not terminated
+
+        if (terminated or truncated) and self.autoreset:
+            self._start_autoreset()
+
+        return observation, self._step_reward, terminated, truncated, info
 
-        return observation, reward, terminated, False, info
+    def _interrupt_episode(self, failure: SimulatorFailure) -> tuple:
+        self._logger.warning(f"Truncating episode {self.episode_counter}: {failure}")
+        self._instance.reap()
 
-    def _step_simulation(self, actions: List[pb.Action]) -> List[pb.State]:
+        info = dict(self._last_info or {})
+        info["simulator_failure"] = str(failure)
+
+        if self.autoreset:
+            self._start_autoreset()
+
+        return self._last_observation, self._step_reward, False, True, info
+
+    def _observe(self, states: List[pb.State]):
+        observation = self.get_obs(states)
+        if self.observation_mode == "flat" and not isinstance(observation, np.ndarray):
+            # the subclass only builds Dict observations
+            return flatten(self.dict_observation_space, observation)
+        return observation
+
+    def _codec_observation(self):
+        """The observation held by the codec, in the observation mode.
+
+        Meant to be returned by get_obs, once the codec has read the State. The
+        vector is copied, as the codec overwrites it on the next step.
+        """
+        vector = self._codec.buffer.copy()
+        if self.observation_mode == "flat":
+            return vector
+        return self._codec.unflatten(vector)
+
+    def _start_autoreset(self) -> None:
+        # the new episode starts while the last transition is consumed
+        flow = self.reset_flow()
+        next(flow)
+        self._autoreset_flow = flow
+
+    def _resume_autoreset(self) -> Optional[tuple]:
+        try:
+            next(self._autoreset_flow)
+        except StopIteration as stop:
+            self._autoreset_flow = None
+            observation, info = stop.value
+            return observation, 0.0, False, False, info
+        return None
+
+    def _send_step(self, actions: List[pb.Action], num_ticks: int = 1) -> None:
         # sending the Step request
-        request = pb.StepRequest(actions=actions)
-        send_message_to_simulation(self.socket, request)
+        request = pb.StepRequest()
+        request.actions.extend(actions)
+        request.num_ticks = num_ticks
+        self._instance.send(request)
 
+    def _recv_step(self) -> Tuple[Iterator[List[pb.State]], int, bool]:
         # receive the Step reply
-        reply = recv_message_from_simulation(self.socket, pb.STEP)
-        return reply.states
+        reply = self._instance.recv(pb.STEP)
+
+        if self.packed is not None:
+            self.packed.decode(reply.packed)
+
+        return self._step_frames(reply), max(reply.num_ticks, 1), reply.done
+
+    def _step_frames(self, reply: pb.StepResponse) -> Iterator[List[pb.State]]:
+        # the states of every simulated tick, in order
+        if self._cache is None:
+            for frame in reply.frames:
+                yield frame.states
+            yield reply.states
+            return
+
+        if not self._cache.follows(reply.sequence):
+            # some deltas were lost, only the last tick can be recovered
+            self._logger.warning(
+                f"Delta sequence gap ({self._cache.sequence} => {reply.sequence})"
+            )
+            self._sync_simulation()
+            yield self._cache.states
+            return
+
+        # the cached states are updated in place, tick by tick (if the caller
+        # stops before the last tick, the next reply triggers a resync)
+        for frame in reply.frames:
+            yield self._cache.apply(frame.deltas)
+        states = self._cache.apply(reply.deltas)
+        self._cache.advance(reply.sequence)
+        yield states
+
+    def _new_actions(self, count: int) -> List[pb.Action]:
+        """Empty actions for get_action to fill."""
+        if not self.reuse_actions:
+            return [pb.Action() for _ in range(count)]
+
+        # the Step request copies the actions, so the same ones serve every step
+        if len(self._actions) != count:
+            self._actions = [pb.Action() for _ in range(count)]
+        for action in self._actions:
+            action.Clear()
+        return self._actions
 
     def _close_simulation(self) -> None:
-        # stop simulation process
-        self.node.kill()
-        self.node.wait(timeout=10.0)
-        self.node = None
+        # stop simulation process (or close its session), which may already be
+        # stopped (see close_fleet)
+        if self._instance.running:
+            self._instance.stop(self.close_timeout)
 
-        # save recording
+        # save recording, complete once the simulator has replied Close
         self._save_recording()
 
     def close(self) -> None:
-        if self.node is not None:
-            # closing siumulation
-            self._close_simulation()
+        self._autoreset_flow = None
+
+        # closing siumulation
+        self._close_simulation()
+
+        if self._standby is not None:
+            # closing standby simulations
+            self._standby.close()
 
         # closing connection
-        self.socket.close()
+        self._instance.close()
         self.context.term()
 
+        if self._allocator is not None:
+            # releasing the endpoints (if any is still claimed)
+            self._allocator.close()
+
+    async def __aenter__(self) -> "BaseAsaEnv":
+        return self
+
+    async def __aexit__(self, *args) -> bool:
+        self.close()
+        return False
+
     def _save_recording(self) -> None:
         cwd = os.getcwd()
         input_path = f"{cwd}/../bin/execution.acmi"
@@ -1,5 +1,4 @@
 import logging
-from collections import OrderedDict
 from typing import Callable, List, Optional, Tuple
 
 import numpy as np
@@ -10,10 +9,39 @@ import asagym.proto.simulator_pb2 as pb
 from asagym.envs.asa import BaseAsaEnv
 from asagym.utils.logger import fork_logger
 
+# the owner and foe fields of the observation (as State field paths)
+OWNER_COLUMNS = (
+    "owner.player_state.latitude",
+    "owner.player_state.longitude",
+    "owner.player_state.altitude",
+    "owner.player_state.heading",
+    "owner.player_state.airspeed",
+    "owner.base_altitude",
+    "owner.fuel_amount",
+    "owner.num_msl",
+)
+FOE_COLUMNS = (
+    "player_state.latitude",
+    "player_state.longitude",
+    "player_state.altitude",
+    "player_state.heading",
+    "player_state.airspeed",
+    "true_azmth",
+    "rel_azmth",
+    "range",
+    "wez_own2foe_max",
+    "wez_own2foe_nez",
+    "wez_foe2own_max",
+    "wez_foe2own_nez",
+)
+
 
 class BeyondVisualRangeEnv(BaseAsaEnv):
     """Scenario: 1 RL x 1 BT"""
 
+    STATE_FIELDS = OWNER_COLUMNS + tuple(f"foes.{name}" for name in FOE_COLUMNS)
+    OBSERVATION_SOURCES = {"owner": "owner", "foe": "foes.0"}
+
     def __init__(
         self,
         reward: Callable[[pb.State], float],
@@ -98,17 +126,18 @@ class BeyondVisualRangeEnv(BaseAsaEnv):
         return 1, self._initialization_func()
 
     def get_action(self, action: Dict) -> List[pb.Action]:
-        action = pb.Action(
-            id=self.own_id,
-            heading=action["heading"][0],
-            load_factor=action["load_factor"][0],
-            altitude=action["altitude"][0],
-            base_altitude=action["base_altitude"][0],
-            pitch=action["pitch"][0],
-            airspeed=action["airspeed"][0],
-        )
-        self._logger.debug(f"Action: {MessageToDict(action)}")
-        return [action]
+        actions = self._new_actions(1)
+        sim_action = actions[0]
+        sim_action.id = self.own_id
+        sim_action.heading = action["heading"][0]
+        sim_action.load_factor = action["load_factor"][0]
+        sim_action.altitude = action["altitude"][0]
+        sim_action.base_altitude = action["base_altitude"][0]
+        sim_action.pitch = action["pitch"][0]
+        sim_action.airspeed = action["airspeed"][0]
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Action: {MessageToDict(sim_action)}")
+        return actions
 
     def get_info(self, states: List[pb.State]) -> Optional[Dict]:
         assert len(states) == 1
@@ -119,91 +148,45 @@ class BeyondVisualRangeEnv(BaseAsaEnv):
             "step_count": self.step_counter,
             "end_of_episode": state.end_of_episode,
         }
-        self._logger.debug(f"Information: {info}")
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Information: {info}")
         return info
 
+    def reset_callback(self, _: List[pb.State]) -> None:
+        if self.packed is not None:
+            # the columns gathered from the packed states on every step, in the
+            # order of the observation vector
+            self._owner_slice, fields = self._codec.segment("owner")
+            self._owner_columns = self.packed.player_columns(
+                [f"owner.{name}" for name in fields]
+            )
+            self._foe_slice, fields = self._codec.segment("foe")
+            self._foe_columns = self.packed.foe_columns(fields)
+
     def get_obs(self, states: List[pb.State]) -> Space:
         assert len(states) == 1
         state = states[0]
 
-        # foes field may be empty
-        if len(state.foes) == 0:
-            state["foes"] = [dict(self.last_obs["foe"])]
+        # foes field may be empty, the last foe observed is then kept
+        if self.packed is not None:
+            self._read_packed(state)
+        else:
+            self._codec.encode(state)
 
-        obs = OrderedDict(
-            {
-                "owner": OrderedDict(
-                    {
-                        "player_state": OrderedDict(
-                            {
-                                "latitude": np.squeeze(
-                                    np.array([state.owner.player_state.latitude])
-                                ),
-                                "longitude": np.squeeze(
-                                    np.array([state.owner.player_state.longitude])
-                                ),
-                                "altitude": np.squeeze(
-                                    np.array([state.owner.player_state.altitude])
-                                ),
-                                "heading": np.squeeze(
-                                    np.array([state.owner.player_state.heading])
-                                ),
-                                "airspeed": np.squeeze(
-                                    np.array([state.owner.player_state.airspeed])
-                                ),
-                            }
-                        ),
-                        "base_altitude": np.squeeze(
-                            np.array([state.owner.base_altitude])
-                        ),
-                        "fuel_amount": np.squeeze(np.array([state.owner.fuel_amount])),
-                        "num_msl": np.squeeze(np.array([state.owner.num_msl])),
-                    }
-                ),
-                "foe": OrderedDict(
-                    {
-                        "player_state": OrderedDict(
-                            {
-                                "latitude": np.squeeze(
-                                    np.array([state.foes[0].player_state.latitude])
-                                ),
-                                "longitude": np.squeeze(
-                                    np.array([state.foes[0].player_state.longitude])
-                                ),
-                                "altitude": np.squeeze(
-                                    np.array([state.foes[0].player_state.altitude])
-                                ),
-                                "heading": np.squeeze(
-                                    np.array([state.foes[0].player_state.heading])
-                                ),
-                                "airspeed": np.squeeze(
-                                    np.array([state.foes[0].player_state.airspeed])
-                                ),
-                            }
-                        ),
-                        "true_azmth": np.squeeze(np.array([state.foes[0].true_azmth])),
-                        "rel_azmth": np.squeeze(np.array([state.foes[0].rel_azmth])),
-                        "range": np.squeeze(np.array([state.foes[0].range])),
-                        "wez_own2foe_max": np.squeeze(
-                            np.array([state.foes[0].wez_own2foe_max])
-                        ),
-                        "wez_own2foe_nez": np.squeeze(
-                            np.array([state.foes[0].wez_own2foe_nez])
-                        ),
-                        "wez_foe2own_max": np.squeeze(
-                            np.array([state.foes[0].wez_foe2own_max])
-                        ),
-                        "wez_foe2own_nez": np.squeeze(
-                            np.array([state.foes[0].wez_foe2own_nez])
-                        ),
-                    }
-                ),
-            }
-        )
+        obs = self._codec_observation()
         self.last_obs = obs
-        self._logger.debug(f"Observation: {obs}")
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Observation: {obs}")
         return obs
 
+    def _read_packed(self, state: pb.State) -> None:
+        vector = self._codec.buffer
+        vector[self._owner_slice] = self.packed.players[0, self._owner_columns]
+
+        foe_rows = self.packed.foe_rows(state.id)
+        if len(foe_rows) > 0:
+            vector[self._foe_slice] = self.packed.foes[foe_rows[0], self._foe_columns]
+
     def get_termination(self, states: List[pb.State]) -> bool:
         eoe = False
         for state in states:
@@ -214,7 +197,7 @@ class BeyondVisualRangeEnv(BaseAsaEnv):
             eoe |= termination
         return eoe
 
-    def get_reward(self, states: List[pb.State]) -> float:
+    def get_reward(self, states: List[pb.State], done: bool) -> float:
         assert len(states) == 1
         state = states[0]
 
@@ -1,6 +1,5 @@
 import numpy
 import logging
-from collections import OrderedDict
 from typing import Callable, Optional
 
 import numpy as np
@@ -17,6 +16,23 @@ from asagym.utils import mixr
 class BeyondVisualRange2rlx1Env(BaseAsaEnv):
     """ """
 
+    STATE_FIELDS = (
+        "owner.player_state",
+        "owner.base_altitude",
+        "owner.fuel_amount",
+        "owner.num_msl",
+        "wing.player_state",
+        "foes.player_state",
+        "foes.true_azmth",
+        "foes.rel_azmth",
+        "foes.range",
+        "foes.wez_own2foe_max",
+        "foes.wez_own2foe_nez",
+        "foes.wez_foe2own_max",
+        "foes.wez_foe2own_nez",
+    )
+    OBSERVATION_SOURCES = {"owner": "owner", "wingman": "wing", "foe": "foes.0"}
+
     def __init__(self, reward: Callable[[pb.State], float], **kwargs):
         self._reward_func = reward
 
@@ -208,146 +224,10 @@ class BeyondVisualRange2rlx1Env(BaseAsaEnv):
         return info
 
     def get_obs(self, simulation_state: pb.State) -> Space:
-        if len(simulation_state.foes) == 0:
-            simulation_state["foes"] = [dict(self.last_obs["foe"])]
-
-        simulation_state.owner.player_state.heading
+        # foes field may be empty, the last foe observed is then kept
+        self._codec.encode(simulation_state)
 
-        obs = OrderedDict(
-            {
-                "owner": OrderedDict(
-                    {
-                        "player_state": OrderedDict(
-                            {
-                                "latitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.owner.player_state.latitude]
-                                    )
-                                ),
-                                "longitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.owner.player_state.longitude]
-                                    )
-                                ),
-                                "altitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.owner.player_state.altitude]
-                                    )
-                                ),
-                                "heading": np.squeeze(
-                                    np.array(
-                                        [simulation_state.owner.player_state.heading]
-                                    )
-                                ),
-                                "airspeed": np.squeeze(
-                                    np.array(
-                                        [simulation_state.owner.player_state.airspeed]
-                                    )
-                                ),
-                            }
-                        ),
-                        "base_altitude": np.squeeze(
-                            np.array([simulation_state.owner.base_altitude])
-                        ),
-                        "fuel_amount": np.squeeze(
-                            np.array([simulation_state.owner.fuel_amount])
-                        ),
-                        "num_msl": np.squeeze(
-                            np.array([simulation_state.owner.num_msl])
-                        ),
-                    }
-                ),
-                "wingman": OrderedDict(
-                    {
-                        "player_state": OrderedDict(
-                            {
-                                "latitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.wing.player_state.latitude]
-                                    )
-                                ),
-                                "longitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.wing.player_state.longitude]
-                                    )
-                                ),
-                                "altitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.wing.player_state.altitude]
-                                    )
-                                ),
-                                "heading": np.squeeze(
-                                    np.array(
-                                        [simulation_state.wing.player_state.heading]
-                                    )
-                                ),
-                                "airspeed": np.squeeze(
-                                    np.array(
-                                        [simulation_state.wing.player_state.airspeed]
-                                    )
-                                ),
-                            }
-                        ),
-                    }
-                ),
-                "foe": OrderedDict(
-                    {
-                        "player_state": OrderedDict(
-                            {
-                                "latitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.foes[0].player_state.latitude]
-                                    )
-                                ),
-                                "longitude": np.squeeze(
-                                    np.array(
-                                        [
-                                            simulation_state.foes[
-                                                0
-                                            ].player_state.longitude
-                                        ]
-                                    )
-                                ),
-                                "altitude": np.squeeze(
-                                    np.array(
-                                        [simulation_state.foes[0].player_state.altitude]
-                                    )
-                                ),
-                                "heading": np.squeeze(
-                                    np.array(
-                                        [simulation_state.foes[0].player_state.heading]
-                                    )
-                                ),
-                                "airspeed": np.squeeze(
-                                    np.array(
-                                        [simulation_state.foes[0].player_state.airspeed]
-                                    )
-                                ),
-                            }
-                        ),
-                        "true_azmth": np.squeeze(
-                            np.array([simulation_state.foes[0].true_azmth])
-                        ),
-                        "rel_azmth": np.squeeze(
-                            np.array([simulation_state.foes[0].rel_azmth])
-                        ),
-                        "range": np.squeeze(np.array([simulation_state.foes[0].range])),
-                        "wez_own2foe_max": np.squeeze(
-                            np.array([simulation_state.foes[0].wez_own2foe_max])
-                        ),
-                        "wez_own2foe_nez": np.squeeze(
-                            np.array([simulation_state.foes[0].wez_own2foe_nez])
-                        ),
-                        "wez_foe2own_max": np.squeeze(
-                            np.array([simulation_state.foes[0].wez_foe2own_max])
-                        ),
-                        "wez_foe2own_nez": np.squeeze(
-                            np.array([simulation_state.foes[0].wez_foe2own_nez])
-                        ),
-                    }
-                ),
-            }
-        )
+        obs = self._codec_observation()
         self.last_obs = obs
         if self._logger.isEnabledFor(logging.DEBUG):
             self._logger.debug(f"Observation: {obs}")
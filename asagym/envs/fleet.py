@@ -0,0 +1,106 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+import zmq
+
+from asagym.envs.asa import BaseAsaEnv
+from asagym.utils.simulator import CLOSE_TIMEOUT, shutdown
+
+# how often the simulators still starting are checked for exits and timeouts
+POLL_INTERVAL_MS = 100
+
+
+class ColdStartReport:
+    """How long a fleet of simulators took to be ready, in seconds."""
+
+    def __init__(self, num_envs: int):
+        self.total = 0.0
+        # the cold-start time of each env (None if its simulator failed)
+        self.instances: List[Optional[float]] = [None] * num_envs
+        self.failures: Dict[int, str] = {}  # id of env => reason
+
+    def __str__(self) -> str:
+        ready = [t for t in self.instances if t is not None]
+        slowest = max(ready, default=0.0)
+        mean = sum(ready) / len(ready) if len(ready) > 0 else 0.0
+        return (
+            f"{len(ready)}/{len(self.instances)} simulators ready in "
+            f"{self.total:.3f} s (mean {mean:.3f} s, slowest {slowest:.3f} s)"
+        )
+
+    def check(self) -> None:
+        """Raises a RuntimeError listing the failures, if any."""
+        if len(self.failures) > 0:
+            reasons = "; ".join(f"env {i}: {r}" for i, r in self.failures.items())
+            raise RuntimeError(f"Simulators failed to start ({reasons})")
+
+
+def start_fleet(
+    envs: Sequence[BaseAsaEnv], timeout: Optional[float] = 60.0
+) -> ColdStartReport:
+    """Starts the simulators of all environments at once, and waits for them.
+
+    Every simulator is spawned (and sent its Init request) before any reply is
+    awaited, then the replies are polled as they arrive. A simulator not ready
+    within `timeout` seconds of its start is killed, as is one that has exited.
+    The next `reset` of each environment uses its (fresh) simulator.
+
+    Raises a RuntimeError if any simulator failed, once the others are ready.
+    """
+    report = ColdStartReport(len(envs))
+    start = time.perf_counter()
+
+    for env in envs:
+        env.start_simulation()
+
+    poller = zmq.Poller()
+    pending: Dict[zmq.Socket, int] = {}  # socket => id of its env
+    for idx, env in enumerate(envs):
+        if env.simulator.starting:
+            pending[env.socket] = idx
+            poller.register(env.socket, zmq.POLLIN)
+        else:
+            # it was already running
+            report.instances[idx] = env.simulator.cold_start
+
+    while len(pending) > 0:
+        readable = dict(poller.poll(POLL_INTERVAL_MS))
+        now = time.perf_counter()
+
+        for socket, idx in list(pending.items()):
+            env = envs[idx]
+            expired = timeout is not None and now - env.simulator.started_at > timeout
+            try:
+                if socket in readable:
+                    report.instances[idx] = env.wait_simulation()
+                elif not env.simulator.alive:
+                    # fails at once, there is nothing left to wait for
+                    env.wait_simulation(timeout=0.0)
+                elif expired:
+                    env.wait_simulation(timeout)
+                else:
+                    continue
+            except (RuntimeError, TimeoutError) as e:
+                report.failures[idx] = str(e)
+
+            poller.unregister(socket)
+            del pending[socket]
+
+    report.total = time.perf_counter() - start
+    report.check()
+    return report
+
+
+def close_fleet(envs: Sequence[BaseAsaEnv], timeout: Optional[float] = None) -> None:
+    """Closes all environments, stopping their simulators at once.
+
+    Every simulator is sent its Close request before any reply is awaited (see
+    `shutdown`), so that closing many environments takes about as long as
+    closing one. Their recordings are saved once all of them have exited. The
+    timeout defaults to the longest close_timeout of the environments.
+    """
+    if timeout is None:
+        timeout = max((env.close_timeout for env in envs), default=CLOSE_TIMEOUT)
+    shutdown([env.simulator for env in envs], timeout)
+    for env in envs:
+        env.close()
@@ -1,18 +1,67 @@
 import logging
 from collections import OrderedDict
-from typing import Callable, List, Optional, Tuple, Mapping
+from operator import attrgetter
+from typing import Callable, Dict as TypingDict, List, Optional, Tuple, Mapping
 
 import numpy as np
-from google.protobuf.json_format import MessageToDict, ParseDict
+from google.protobuf.json_format import MessageToDict
 from gymnasium.spaces import Box, Dict, Discrete, Space, Sequence, Tuple as SpaceTuple
 
 import asagym.proto.simulator_pb2 as pb
 from asagym.envs.asa import BaseAsaEnv
 from asagym.utils.logger import fork_logger
 
+# the columns of the ally and foe arrays (see the "array" observation mode)
+ALLY_FIELDS = (
+    "latitude",
+    "longitude",
+    "altitude",
+    "heading",
+    "airspeed",
+    "base_altitude",
+    "fuel_amount",
+    "num_msl",
+    "active",
+)
+FOE_FIELDS = ("latitude", "longitude", "altitude", "heading", "airspeed", "active")
+
+# the bounds of each column
+ALLY_LOW = np.array([-90.0, -180.0, 0.0, -180.0, 0.0, 0.0, 0.0, -1.0, 0.0])
+ALLY_HIGH = np.array([90.0, 180.0, np.inf, 180.0, np.inf, np.inf, np.inf, np.inf, 1.0])
+FOE_LOW = np.array([-90.0, -180.0, 0.0, -180.0, 0.0, 0.0])
+FOE_HIGH = np.array([90.0, 180.0, np.inf, 180.0, np.inf, 1.0])
+
+# the columns of a row, read from the State of its player at once
+_PLAYER_STATE = ("latitude", "longitude", "altitude", "heading", "airspeed")
+_read_ally = attrgetter(
+    *(f"owner.player_state.{name}" for name in _PLAYER_STATE),
+    "owner.base_altitude",
+    "owner.fuel_amount",
+    "owner.num_msl",
+    "active",
+)
+_read_foe = attrgetter(
+    *(f"owner.player_state.{name}" for name in _PLAYER_STATE), "active"
+)
+
 
 class NMBeyondVisualRangeEnv(BaseAsaEnv):
-    """Scenario: N RL x M Opponents"""
+    """Scenario: N RL x M Opponents
+
+    Besides the Dict and flat observations, the "array" observation mode gives
+    the allies and foes as `(num_players, len(ALLY_FIELDS))` and
+    `(num_opponents, len(FOE_FIELDS))` arrays, ordered by player id. The flat
+    observation is the concatenation of both arrays.
+    """
+
+    OBSERVATION_MODES = ("dict", "flat", "array")
+
+    # player states are read from the owner of every State (see teams)
+    STATE_FIELDS = (
+        "owner.base_altitude",
+        "owner.fuel_amount",
+        "owner.num_msl",
+    )
 
     def __init__(
         self,
@@ -62,13 +111,47 @@ class NMBeyondVisualRangeEnv(BaseAsaEnv):
                 ),
             )
 
-        observation_space = Dict(
+        dict_observation_space = Dict(
             {
                 "allies": SpaceTuple(allies),
                 "foes": SpaceTuple(foes),
             }
         )
 
+        # the rows of each player, filled in a single pass over the States
+        self._allies = np.zeros((num_players, len(ALLY_FIELDS)), dtype=np.float64)
+        self._foes = np.zeros((num_opponents, len(FOE_FIELDS)), dtype=np.float64)
+        self._ally_rows: TypingDict[int, int] = {}  # id => row
+        self._foe_rows: TypingDict[int, int] = {}
+
+        array_observation_space = Dict(
+            {
+                "allies": Box(
+                    low=np.tile(ALLY_LOW, (num_players, 1)),
+                    high=np.tile(ALLY_HIGH, (num_players, 1)),
+                    dtype=np.float64,
+                ),
+                "foes": Box(
+                    low=np.tile(FOE_LOW, (num_opponents, 1)),
+                    high=np.tile(FOE_HIGH, (num_opponents, 1)),
+                    dtype=np.float64,
+                ),
+            }
+        )
+
+        observation_mode = kwargs.get("observation_mode", "dict")
+        if observation_mode == "array":
+            observation_space = array_observation_space
+        elif observation_mode == "flat":
+            boxes = array_observation_space.values()
+            observation_space = Box(
+                low=np.concatenate([box.low.ravel() for box in boxes]),
+                high=np.concatenate([box.high.ravel() for box in boxes]),
+                dtype=np.float64,
+            )
+        else:
+            observation_space = dict_observation_space
+
         actions = ()
         for _ in range(self._num_players):
             actions += (
@@ -94,23 +177,40 @@ class NMBeyondVisualRangeEnv(BaseAsaEnv):
         )
 
         self._logger = fork_logger("nmbvr", super().logger)
+        self.dict_observation_space = dict_observation_space
+        self.flat_layout_space = array_observation_space
 
         self.last_obs = None
 
     def reset_init(self) -> Tuple[int, Optional[dict]]:
         return self._num_players, self._initialization_func()
 
-    def reset_callback(self, _: List[pb.State]) -> None:
+    def reset_callback(self, states: List[pb.State]) -> None:
         # saving own player's ids in ascending order to fill the action messages
-        self._own_ids = sorted(self.summary.own_team.keys())
+        self._own_ids = sorted(self.teams.own_team.keys())
+
+        # the players without a row (beyond the space) are not observed
+        foe_ids = sorted(s.id for s in states if s.side == pb.RED)
+        ally_ids = self._own_ids[: len(self._allies)]
+        self._ally_rows = {id: row for row, id in enumerate(ally_ids)}
+        self._foe_rows = {id: row for row, id in enumerate(foe_ids[: len(self._foes)])}
+        self._allies[:] = 0.0
+        self._foes[:] = 0.0
 
     def get_action(self, action: Tuple) -> List[pb.Action]:
         # allocate buffer with actions
-        actions = [pb.Action() for _ in range(self._num_players)]
+        actions = self._new_actions(self._num_players)
         for idx, dict_action in enumerate(action):
-            ParseDict(dict_action, actions[idx])
-            actions[idx].id = self._own_ids[idx]
-            self._logger.debug(f"Action: {MessageToDict(actions[idx])}")
+            sim_action = actions[idx]
+            sim_action.id = self._own_ids[idx]
+            sim_action.heading = dict_action["heading"][0]
+            sim_action.load_factor = dict_action["load_factor"][0]
+            sim_action.altitude = dict_action["altitude"][0]
+            sim_action.base_altitude = dict_action["base_altitude"][0]
+            sim_action.pitch = dict_action["pitch"][0]
+            sim_action.airspeed = dict_action["airspeed"][0]
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(f"Action: {MessageToDict(sim_action)}")
         return actions
 
     def get_info(self, states: List[pb.State]) -> Optional[Dict]:
@@ -121,46 +221,50 @@ class NMBeyondVisualRangeEnv(BaseAsaEnv):
             # "step_count": self.step_counter, <= TODO: is this really necessary?
             "end_of_episode": state.end_of_episode,
         }
-        self._logger.debug(f"Information: {info}")
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Information: {info}")
         return info
 
     def get_obs(self, states: List[pb.State]) -> Space:
         assert len(states) >= 1
-        obs = {
-            "allies": (),
-            "foes": (),
-        }
 
-        for id in sorted(self.summary.own_team.keys()):
-            player_state = self.summary.own_team.get(id)
-            dict_state = MessageToDict(player_state)
-            dict_state.pop("id")
-            # the following fields do not belong to PlayerState
-            for s in states:
-                if s.id == id:
-                    dict_state["base_altitude"] = s.owner.base_altitude
-                    dict_state["fuel_amount"] = s.owner.fuel_amount
-                    dict_state["num_msl"] = s.owner.num_msl
-                    dict_state["active"] = s.active
-                    break
-            # append to tuple (sequence space)
-            obs["allies"] += (dict_state,)
-
-        for id in sorted(self.summary.ene_team.keys()):
-            player_state = self.summary.ene_team.get(id)
-            dict_state = MessageToDict(player_state)
-            dict_state.pop("id")
-            for s in states:
-                if s.id == id:
-                    dict_state["active"] = s.active
-            # append to tuple (sequence space)
-            obs["foes"] += (dict_state,)
+        # the players missing from the states keep their last rows
+        allies, foes = self._allies, self._foes
+        ally_rows, foe_rows = self._ally_rows, self._foe_rows
+        for state in states:
+            if state.side == pb.BLUE:
+                row = ally_rows.get(state.id)
+                if row is not None:
+                    allies[row] = _read_ally(state)
+            elif state.side == pb.RED:
+                row = foe_rows.get(state.id)
+                if row is not None:
+                    foes[row] = _read_foe(state)
+
+        if self.observation_mode == "flat":
+            obs = np.concatenate((allies.ravel(), foes.ravel()))
+        elif self.observation_mode == "array":
+            obs = OrderedDict({"allies": allies.copy(), "foes": foes.copy()})
+        else:
+            obs = {
+                "allies": tuple(self._to_dict(ALLY_FIELDS, r) for r in allies.tolist()),
+                "foes": tuple(self._to_dict(FOE_FIELDS, r) for r in foes.tolist()),
+            }
 
         # observation
         self.last_obs = obs
-        self._logger.debug(f"Observation: {obs}")
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"Observation: {obs}")
         return obs
 
+    @staticmethod
+    def _to_dict(fields: Tuple[str, ...], row: List[float]) -> dict:
+        dict_state = dict(zip(fields, row))
+        dict_state["active"] = bool(dict_state["active"])
+        if "num_msl" in dict_state:
+            dict_state["num_msl"] = int(dict_state["num_msl"])
+        return dict_state
+
     def get_termination(self, states: List[pb.State]) -> bool:
         assert len(states) >= 1
         # checking if there is any player on both teams team
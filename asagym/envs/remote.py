@@ -0,0 +1,362 @@
+"""Environments hosted by remote workers, reached through a broker.
+
+A worker hosts some env slots on its node and registers them with the broker
+(see asagym.utils.broker). A learner uses AsaRemoteVectorEnv to attach to any
+free slots, wherever they live.
+
+Usage (worker): python -m asagym.envs.remote --broker URL --env-fn module:callable
+    [--num-envs N] [--rank R]
+
+The env fn is called with the rank of each slot (R, R + 1, ...), which must be
+unique on the node (it defines the ports of the simulators).
+"""
+
+import argparse
+import importlib
+import logging
+import pickle
+import queue
+import threading
+import time
+import uuid
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+import gymnasium as gym
+import numpy as np
+import zmq
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import create_empty_array, iterate
+
+from asagym.envs.vector import write_row
+from asagym.utils.broker import (
+    ATTACH,
+    ATTACHED,
+    DETACH,
+    FAILED,
+    HEARTBEAT,
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_LIVENESS,
+    LEASE,
+    READY,
+    REPLY,
+    REQUEST,
+)
+
+
+def load_env_fn(path: str) -> Callable[[int], gym.Env]:
+    """Imports the callable at "module:callable"."""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _execute(env: gym.Env, command: str, data: Any) -> Any:
+    if command == "reset":
+        seed, options = data
+        return env.reset(seed=seed, options=options)
+
+    if command == "step":
+        observation, reward, terminated, truncated, info = env.step(data)
+        autoreset = getattr(env.unwrapped, "autoreset", False)
+        if (terminated or truncated) and not autoreset:
+            # the same as the workers of AsyncVectorEnv
+            old_observation, old_info = observation, info
+            observation, info = env.reset()
+            info["final_observation"] = old_observation
+            info["final_info"] = old_info
+        return observation, reward, terminated, truncated, info
+
+    raise ValueError(f"Unknown command: {command}")
+
+
+class RemoteWorker:
+    """Hosts env slots for a broker, stepping each of them in its own thread.
+
+    The main thread only moves messages between the broker and the slots, so
+    heartbeats keep flowing while the envs are stepped.
+    """
+
+    def __init__(
+        self,
+        broker: str,
+        env_fn: Callable[[int], gym.Env],
+        num_envs: int = 1,
+        rank: int = 0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.broker = broker
+        self.logger = logger or logging.getLogger(__name__)
+        self.context = zmq.Context()
+        self.envs = [env_fn(rank + idx) for idx in range(num_envs)]
+
+        # the slots push their replies to the main thread
+        self._results = self.context.socket(zmq.PULL)
+        self._results.bind(f"inproc://asagym-worker-{id(self)}")
+        self._requests: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        for idx in range(num_envs):
+            self._requests.append(queue.Queue())
+            thread = threading.Thread(
+                target=self._serve, args=(idx,), name=f"asagym-slot-{idx}"
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.socket: Optional[zmq.Socket] = None
+
+    def run(self) -> None:
+        """Serves the broker until the context is terminated (or interrupted)."""
+        env = self.envs[0]
+        spaces = pickle.dumps((env.observation_space, env.action_space))
+        poller = zmq.Poller()
+        poller.register(self._results, zmq.POLLIN)
+
+        try:
+            while True:
+                # (re)connecting with a new identity, the broker forgets the old one
+                self._connect(poller, spaces)
+                self._serve_broker(poller)
+        except (KeyboardInterrupt, zmq.ContextTerminated):
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for requests in self._requests:
+            requests.put(None)
+        for thread in self._threads:
+            thread.join()
+        for env in self.envs:
+            env.close()
+
+        if self.socket is not None:
+            self.socket.close(linger=0)
+        self._results.close(linger=0)
+        self.context.term()
+
+    def _connect(self, poller: zmq.Poller, spaces: bytes) -> None:
+        if self.socket is not None:
+            poller.unregister(self.socket)
+            self.socket.close(linger=0)
+
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.setsockopt(zmq.IDENTITY, uuid.uuid4().hex.encode())
+        self.socket.connect(self.broker)
+        poller.register(self.socket, zmq.POLLIN)
+
+        self.socket.send_multipart([READY, str(len(self.envs)).encode(), spaces])
+        self.logger.info(f"Registering {len(self.envs)} slots at {self.broker}")
+
+    def _serve_broker(self, poller: zmq.Poller) -> None:
+        # returns once the broker has been silent for too long
+        last_seen = time.monotonic()
+        next_heartbeat = last_seen + HEARTBEAT_INTERVAL
+        while time.monotonic() - last_seen < HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS:
+            events = dict(poller.poll(HEARTBEAT_INTERVAL * 1000))
+
+            if self.socket in events:
+                frames = self.socket.recv_multipart()
+                last_seen = time.monotonic()
+                if frames[0] == REQUEST:
+                    self._requests[int(frames[1])].put(frames[2])
+
+            if self._results in events:
+                local, payload = self._results.recv_multipart()
+                self.socket.send_multipart([REPLY, local, payload])
+
+            if time.monotonic() >= next_heartbeat:
+                self.socket.send(HEARTBEAT)
+                next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+
+        self.logger.warning(f"Lost the broker at {self.broker}, reconnecting")
+
+    def _serve(self, idx: int) -> None:
+        results = self.context.socket(zmq.PUSH)
+        results.connect(f"inproc://asagym-worker-{id(self)}")
+        try:
+            while True:
+                payload = self._requests[idx].get()
+                if payload is None:
+                    return
+
+                # the id of the request is echoed, for the learner to match it
+                request_id, command, data = pickle.loads(payload)
+                try:
+                    reply = (request_id, True, _execute(self.envs[idx], command, data))
+                except Exception as e:
+                    self.logger.exception(f"Slot {idx} failed to {command}")
+                    reply = (request_id, False, repr(e))
+                results.send_multipart([str(idx).encode(), pickle.dumps(reply)])
+        finally:
+            results.close(linger=0)
+
+
+class AsaRemoteVectorEnv(VectorEnv):
+    """A vector env whose slots are hosted by remote workers (see RemoteWorker).
+
+    Attaches to `num_envs` free slots of the broker, waiting for enough workers
+    to register. Ended episodes are reset by the workers, as in AsyncVectorEnv.
+    The slots are released on close, or by the broker once nothing has been
+    sent for `lease` seconds (which must outlast the pauses between steps).
+
+    A RuntimeError is raised if the worker of any slot fails, after which every
+    reset or step raises it again (the env must be closed), and a TimeoutError
+    if a reply takes more than `timeout` seconds. The replies of the requests
+    interrupted by either are discarded by the next reset or step.
+    """
+
+    def __init__(
+        self,
+        broker: str,
+        num_envs: int,
+        timeout: Optional[float] = 60.0,
+        copy: bool = True,
+        lease: float = LEASE,
+    ):
+        self.timeout = timeout
+        self.copy = copy
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.connect(broker)
+
+        # the id of the requests in flight (those of every slot share it), and
+        # the reasons of the failed slots
+        self._request_id = 0
+        self._failures: Dict[int, str] = {}
+
+        self.socket.send_multipart(
+            [ATTACH, str(num_envs).encode(), str(lease).encode()]
+        )
+        frames = self._recv(ATTACHED)
+        self.slots: List[int] = pickle.loads(frames[1])
+        observation_space, action_space = pickle.loads(frames[2])
+        self._index = {slot: idx for idx, slot in enumerate(self.slots)}
+
+        super().__init__(num_envs, observation_space, action_space)
+        self.observations = create_empty_array(
+            self.single_observation_space, n=self.num_envs, fn=np.zeros
+        )
+        self._rewards = np.zeros((self.num_envs,), dtype=np.float64)
+        self._terminateds = np.zeros((self.num_envs,), dtype=np.bool_)
+        self._truncateds = np.zeros((self.num_envs,), dtype=np.bool_)
+
+    def reset_async(
+        self,
+        seed: Optional[Union[int, List[int]]] = None,
+        options: Optional[dict] = None,
+    ) -> None:
+        if seed is None:
+            seed = [None for _ in range(self.num_envs)]
+        if isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._new_requests()
+        for slot, single_seed in zip(self.slots, seed):
+            self._send(slot, "reset", (single_seed, options))
+
+    def reset_wait(
+        self,
+        seed: Optional[Union[int, List[int]]] = None,
+        options: Optional[dict] = None,
+    ) -> tuple:
+        infos = {}
+        for idx, (observation, info) in self._gather():
+            self._write_observation(idx, observation)
+            infos = self._add_info(infos, info, idx)
+        return (deepcopy(self.observations) if self.copy else self.observations), infos
+
+    def step_async(self, actions) -> None:
+        self._new_requests()
+        for slot, action in zip(self.slots, iterate(self.action_space, actions)):
+            self._send(slot, "step", action)
+
+    def step_wait(self) -> tuple:
+        infos: Dict[str, Any] = {}
+        for idx, transition in self._gather():
+            (
+                observation,
+                self._rewards[idx],
+                self._terminateds[idx],
+                self._truncateds[idx],
+                info,
+            ) = transition
+            self._write_observation(idx, observation)
+            infos = self._add_info(infos, info, idx)
+
+        return (
+            deepcopy(self.observations) if self.copy else self.observations,
+            np.copy(self._rewards),
+            np.copy(self._terminateds),
+            np.copy(self._truncateds),
+            infos,
+        )
+
+    def close_extras(self, **kwargs) -> None:
+        # the slots stay with their workers, for other learners
+        self.socket.send(DETACH)
+        self.socket.close(linger=1000)
+        self.context.term()
+
+    def _write_observation(self, idx: int, observation: Any) -> None:
+        write_row(self.single_observation_space, self.observations, idx, observation)
+
+    def _new_requests(self) -> None:
+        if len(self._failures) > 0:
+            slot, reason = next(iter(self._failures.items()))
+            raise RuntimeError(f"Slot {slot} failed: {reason}")
+
+        # the replies still queued (of requests interrupted by an error) are
+        # told apart by their id
+        self._request_id += 1
+
+    def _send(self, slot: int, command: str, data: Any) -> None:
+        payload = pickle.dumps((self._request_id, command, data))
+        self.socket.send_multipart([REQUEST, str(slot).encode(), payload])
+
+    def _gather(self):
+        # the replies of every slot, in the order they arrive
+        pending: Set[int] = set(self.slots)
+        while len(pending) > 0:
+            frames = self._recv(REPLY)
+            slot = int(frames[1])
+            request_id, ok, result = pickle.loads(frames[2])
+            if request_id != self._request_id:
+                continue
+            pending.discard(slot)
+
+            if not ok:
+                raise RuntimeError(f"Slot {slot} failed: {result}")
+            yield self._index[slot], result
+
+    def _recv(self, expected: bytes) -> List[bytes]:
+        timeout = None if self.timeout is None else self.timeout * 1000
+        if self.socket.poll(timeout, zmq.POLLIN) == 0:
+            raise TimeoutError(f"No {expected.decode()} after {self.timeout} s")
+
+        frames = self.socket.recv_multipart()
+        if frames[0] == FAILED:
+            slot, reason = int(frames[1]), frames[2].decode()
+            self._failures[slot] = reason
+            raise RuntimeError(f"Slot {slot} failed: {reason}")
+        if frames[0] != expected:
+            raise RuntimeError(f"Unexpected {frames[0]} from the broker")
+        return frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hosts env slots for a broker.")
+    parser.add_argument("--broker", required=True, help="the backend of the broker")
+    parser.add_argument("--env-fn", required=True, help="module:callable(rank)")
+    parser.add_argument("--num-envs", type=int, default=1)
+    parser.add_argument("--rank", type=int, default=0, help="of the first slot")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    env_fn = load_env_fn(args.env_fn)
+    RemoteWorker(args.broker, env_fn, args.num_envs, args.rank).run()
+
+
+if __name__ == "__main__":
+    main()
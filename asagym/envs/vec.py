@@ -1,7 +1,16 @@
-from typing import Any
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List, Optional
 from logging import getLogger
 
+import gymnasium
+import numpy as np
+from gymnasium import spaces
 from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvObs, VecEnvStepReturn
+
+from asagym.envs.fleet import ColdStartReport
 
 
 class AsaVecEnv(SubprocVecEnv):
@@ -19,3 +28,184 @@ class AsaVecEnv(SubprocVecEnv):
         self.close()
         getLogger(__name__).debug("Vectorized env closed: AsaVecEnv.__exit__")
         return False
+
+    def start_simulators(self, timeout: Optional[float] = 60.0) -> ColdStartReport:
+        """Starts the simulators of all workers at once, and waits for them.
+
+        Every worker spawns its simulator before any of them waits (see
+        BaseAsaEnv.start_simulation), so they start in parallel. As with
+        `start_fleet`, a RuntimeError is raised if any simulator failed, once
+        the others are ready (the workers report their failures rather than
+        raising them, which would end the worker processes).
+        """
+        report = ColdStartReport(self.num_envs)
+        start = time.perf_counter()
+        self.env_method("start_simulation")
+        results = self.env_method("check_simulation", timeout)
+        for idx, (cold_start, failure) in enumerate(results):
+            report.instances[idx] = cold_start
+            if failure is not None:
+                report.failures[idx] = failure
+        report.total = time.perf_counter() - start
+        report.check()
+        return report
+
+
+def _shared_action_space(space: spaces.Space) -> spaces.Space:
+    # nested actions are exchanged (and exposed to the agent) flattened
+    if isinstance(space, (spaces.Dict, spaces.Tuple)):
+        return spaces.flatten_space(space)
+    return space
+
+
+class _SharedMemoryEnv(gymnasium.Wrapper):
+    """Worker side of AsaShmVecEnv, exchanging flattened observations and
+    actions through shared memory instead of the pipe."""
+
+    def __init__(self, env: gymnasium.Env):
+        super().__init__(env)
+        self.observation_space = spaces.flatten_space(env.observation_space)
+        self.action_space = _shared_action_space(env.action_space)
+
+        self._blocks: List[SharedMemory] = []
+        self._observation: Optional[np.ndarray] = None
+        self._action: Optional[np.ndarray] = None
+
+    def attach_shared_memory(
+        self, observations: str, actions: str, index: int, num_envs: int
+    ) -> None:
+        """Maps the rows of this env in the blocks allocated by AsaShmVecEnv."""
+        self._blocks = [SharedMemory(name=observations), SharedMemory(name=actions)]
+        self._observation = np.ndarray(
+            (num_envs,) + self.observation_space.shape,
+            dtype=self.observation_space.dtype,
+            buffer=self._blocks[0].buf,
+        )[index, ...]
+        self._action = np.ndarray(
+            (num_envs,) + self.action_space.shape,
+            dtype=self.action_space.dtype,
+            buffer=self._blocks[1].buf,
+        )[index, ...]
+
+    def reset(self, **kwargs) -> tuple:
+        observation, info = self.env.reset(**kwargs)
+        self._observation[:] = spaces.flatten(self.env.observation_space, observation)
+        return None, info
+
+    def step(self, _) -> tuple:
+        # the action written by the parent process
+        action = self._action.copy()
+        if isinstance(self.env.action_space, spaces.Discrete):
+            action = int(action)
+        elif self.action_space is not self.env.action_space:
+            action = spaces.unflatten(self.env.action_space, action)
+
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._observation[:] = spaces.flatten(self.env.observation_space, observation)
+
+        # only the terminal observation goes through the pipe (see SubprocVecEnv)
+        if terminated or truncated:
+            return self._observation.copy(), reward, terminated, truncated, info
+        return None, reward, terminated, truncated, info
+
+    def close(self) -> None:
+        super().close()
+
+        # the views must be released before the blocks
+        self._observation = None
+        self._action = None
+        for block in self._blocks:
+            block.close()
+
+
+class _SharedMemoryEnvFn:
+    def __init__(self, env_fn: Callable[[], gymnasium.Env]):
+        self.env_fn = env_fn
+
+    def __call__(self) -> gymnasium.Env:
+        return _SharedMemoryEnv(self.env_fn())
+
+
+class AsaShmVecEnv(AsaVecEnv):
+    """AsaVecEnv exchanging observations and actions through shared memory.
+
+    The observations of all envs are laid out flattened in a single
+    `(num_envs, obs_dim)` block, written in place by the workers, so that they
+    are never pickled. The actions are written by the parent in another block,
+    also flattened if the action space is a Dict or a Tuple. Only the rewards,
+    dones and infos go through the pipes.
+    """
+
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gymnasium.Env]],
+        start_method: Optional[str] = None,
+    ):
+        # the workers must share the resource tracker of this process, otherwise
+        # theirs would unlink the blocks when they exit
+        resource_tracker.ensure_running()
+        super().__init__(
+            [_SharedMemoryEnvFn(env_fn) for env_fn in env_fns], start_method
+        )
+
+        # the spaces are the ones of the workers (flattened)
+        self._blocks: List[SharedMemory] = []
+        self._observations = self._allocate(self.observation_space)
+        self._actions = self._allocate(self.action_space)
+
+        observations, actions = (block.name for block in self._blocks)
+        for idx, remote in enumerate(self.remotes):
+            remote.send(
+                (
+                    "env_method",
+                    (
+                        "attach_shared_memory",
+                        (observations, actions, idx, self.num_envs),
+                        {},
+                    ),
+                )
+            )
+        for remote in self.remotes:
+            remote.recv()
+
+    def _allocate(self, space: spaces.Space) -> np.ndarray:
+        shape = (self.num_envs,) + space.shape
+        size = max(int(np.prod(shape)) * space.dtype.itemsize, 1)
+        block = SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        return np.ndarray(shape, dtype=space.dtype, buffer=block.buf)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions[:] = np.asarray(actions).reshape(self._actions.shape)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self) -> VecEnvStepReturn:
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        _, rews, dones, infos, self.reset_infos = zip(*results)
+        # the block is overwritten by the next step
+        return self._observations.copy(), np.stack(rews), np.stack(dones), infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        results = [remote.recv() for remote in self.remotes]
+        _, self.reset_infos = zip(*results)
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._observations.copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+
+        # the views must be released before the blocks
+        self._observations = None
+        self._actions = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
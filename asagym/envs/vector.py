@@ -0,0 +1,338 @@
+from collections import deque
+from copy import deepcopy
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import numpy as np
+import zmq
+from gymnasium import Space
+from gymnasium.spaces import Dict as SpaceDict, Tuple as SpaceTuple
+from gymnasium.vector import SyncVectorEnv
+from gymnasium.vector.utils import create_empty_array, iterate
+
+from asagym.envs.asa import BaseAsaEnv
+from asagym.envs.fleet import ColdStartReport, close_fleet, start_fleet
+from asagym.utils.simulator import WATCHDOG_INTERVAL_MS
+
+
+def write_row(space: Space, batch: Any, index: int, value: Any) -> None:
+    """Writes the value of a single environment into its row of the batch.
+
+    The batch is the one built by `create_empty_array` for the space.
+    """
+    if isinstance(space, SpaceDict):
+        for key, subspace in space.spaces.items():
+            write_row(subspace, batch[key], index, value[key])
+    elif isinstance(space, SpaceTuple):
+        for idx, subspace in enumerate(space.spaces):
+            write_row(subspace, batch[idx], index, value[idx])
+    else:
+        # numpy broadcasts the value to the shape of the row
+        batch[index] = value
+
+
+class AsaVectorEnv(SyncVectorEnv):
+    """Steps many ASA environments (and their simulators) from a single process.
+
+    Every Step request is sent at once, then the replies are handled in the
+    order they arrive, polling the sockets of all simulators. Unlike AsaVecEnv,
+    no worker process is spawned, Python only encodes and decodes messages.
+
+    The environments must not be wrapped, as only the unwrapped ones can be
+    stepped in halves (see BaseAsaEnv.step_send and BaseAsaEnv.step_recv).
+
+    Besides the lockstep `step`, the environments may be stepped independently
+    (as in EnvPool) with `async_reset`, `send` and `recv`, which returns the
+    first `batch_size` environments to reply. An environment whose episode has
+    ended is reset by the next `send` to it, and its first observation comes
+    out of a later `recv`. Both styles must not be mixed.
+
+    Environments created with autoreset reset themselves in background, and
+    return the first observation of the new episode on the following step
+    (in both styles), instead of the same step.
+
+    Environments with a request_timeout are watched while polling, so that a
+    simulator that hangs or exits truncates the episode of its environment
+    only (see BaseAsaEnv.step_recv).
+    """
+
+    def __init__(
+        self,
+        env_fns: Iterable[Callable[[], BaseAsaEnv]],
+        observation_space: Optional[Space] = None,
+        action_space: Optional[Space] = None,
+        copy: bool = True,
+        batch_size: Optional[int] = None,
+    ):
+        super().__init__(
+            env_fns,
+            observation_space=observation_space,
+            action_space=action_space,
+            copy=copy,
+        )
+
+        for env in self.envs:
+            if not isinstance(env, BaseAsaEnv):
+                raise ValueError(
+                    f"{env} is not an (unwrapped) ASA environment, "
+                    "its wrappers would be bypassed"
+                )
+
+        # the number of environments returned by each recv
+        self.batch_size = batch_size or self.num_envs
+        if not 0 < self.batch_size <= self.num_envs:
+            raise ValueError(f"batch_size must be in [1, {self.num_envs}]")
+
+        # whether the simulators must be checked while waiting for replies
+        self._watchdog = any(
+            env.request_timeout is not None or env.init_timeout is not None
+            for env in self.envs
+        )
+
+        self._poller = zmq.Poller()
+        self._waiting: Dict[zmq.Socket, int] = {}  # socket => id of its env
+        self._resets: Dict[int, Generator] = {}  # id of env => its reset flow
+        self._ready: Deque[tuple] = deque()  # (id of env, *transition)
+        self._needs_reset = np.zeros((self.num_envs,), dtype=np.bool_)
+        self._batch = create_empty_array(
+            self.single_observation_space, n=self.batch_size, fn=np.zeros
+        )
+
+    def start_simulators(self, timeout: Optional[float] = 60.0) -> ColdStartReport:
+        """Starts the simulators of all environments at once (see `start_fleet`)."""
+        return start_fleet(self.envs, timeout)
+
+    def reset_wait(
+        self,
+        seed: Optional[Union[int, List[int]]] = None,
+        options: Optional[dict] = None,
+    ):
+        if seed is None:
+            seed = [None for _ in range(self.num_envs)]
+        if isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._terminateds[:] = False
+        self._truncateds[:] = False
+        infos = {}
+        for idx, (env, single_seed) in enumerate(zip(self.envs, seed)):
+            observation, info = env.reset(seed=single_seed, options=options)
+            self._write_observation(idx, observation)
+            infos = self._add_info(infos, info, idx)
+
+        return (deepcopy(self.observations) if self.copy else self.observations), infos
+
+    def step_async(self, actions) -> None:
+        # every simulator starts stepping before any reply is awaited
+        for env, action in zip(self.envs, iterate(self.action_space, actions)):
+            env.step_send(action)
+
+    def step_wait(self) -> tuple:
+        infos: Dict[str, Any] = {}
+
+        # the socket of each environment waiting for a Step reply
+        pending = {env.socket: idx for idx, env in enumerate(self.envs)}
+        poller = zmq.Poller()
+        for socket in pending:
+            poller.register(socket, zmq.POLLIN)
+
+        while len(pending) > 0:
+            for socket in self._poll(poller, pending):
+                idx = pending.pop(socket)
+                env = self.envs[idx]
+
+                # a failed simulator replaces its socket
+                poller.unregister(socket)
+                transition = self._step_recv(env)
+
+                if transition is None:
+                    # another request was sent (for the remaining ticks or by
+                    # the reset of the env, which may have swapped its socket)
+                    pending[env.socket] = idx
+                    poller.register(env.socket, zmq.POLLIN)
+                    continue
+
+                (
+                    observation,
+                    self._rewards[idx],
+                    self._terminateds[idx],
+                    self._truncateds[idx],
+                    info,
+                ) = transition
+
+                ended = self._terminateds[idx] or self._truncateds[idx]
+                if ended and not env.autoreset:
+                    old_observation, old_info = observation, info
+                    observation, info = env.reset()
+                    info["final_observation"] = old_observation
+                    info["final_info"] = old_info
+
+                self._write_observation(idx, observation)
+                infos = self._add_info(infos, info, idx)
+
+        return (
+            deepcopy(self.observations) if self.copy else self.observations,
+            np.copy(self._rewards),
+            np.copy(self._terminateds),
+            np.copy(self._truncateds),
+            infos,
+        )
+
+    def async_reset(
+        self,
+        seed: Optional[Union[int, List[int]]] = None,
+        options: Optional[dict] = None,
+    ) -> None:
+        """Starts resetting all environments, their observations come from `recv`."""
+        if seed is None:
+            seed = [None for _ in range(self.num_envs)]
+        if isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._needs_reset[:] = False
+        for idx, (env, single_seed) in enumerate(zip(self.envs, seed)):
+            self._start_reset(idx, env.reset_flow(seed=single_seed, options=options))
+
+    def send(self, actions, env_ids: Optional[Sequence[int]] = None) -> None:
+        """Sends the actions of some environments (all of them by default).
+
+        The actions are batched in the same order as env_ids.
+        """
+        if env_ids is None:
+            env_ids = range(self.num_envs)
+
+        for idx, action in zip(env_ids, iterate(self.action_space, actions)):
+            idx = int(idx)
+            env = self.envs[idx]
+            if idx in self._resets or env.socket in self._waiting:
+                raise RuntimeError(f"Environment {idx} has not replied yet")
+
+            if self._needs_reset[idx]:
+                # the action is dropped, the episode has already ended
+                self._needs_reset[idx] = False
+                self._start_reset(idx, env.reset_flow())
+            else:
+                env.step_send(action)
+                self._wait(idx)
+
+    def recv(self) -> tuple:
+        """Waits for the first `batch_size` environments to reply.
+
+        Returns their batched observations, rewards, terminations, truncations
+        and infos, along with their ids.
+        """
+        while len(self._ready) < self.batch_size:
+            if len(self._waiting) == 0:
+                raise RuntimeError(
+                    f"Fewer than {self.batch_size} environments are running"
+                )
+
+            for socket in self._poll(self._poller, self._waiting):
+                idx = self._waiting.pop(socket)
+                self._poller.unregister(socket)
+
+                if idx in self._resets:
+                    self._advance_reset(idx)
+                    continue
+
+                transition = self._step_recv(self.envs[idx])
+                if transition is None:
+                    # another Step request was sent for the remaining ticks
+                    self._wait(idx)
+                    continue
+
+                _, _, terminated, truncated, _ = transition
+                ended = terminated or truncated
+                self._needs_reset[idx] = ended and not self.envs[idx].autoreset
+                self._ready.append((idx, *transition))
+
+        env_ids = np.zeros((self.batch_size,), dtype=np.int64)
+        rewards = np.zeros((self.batch_size,), dtype=np.float64)
+        terminateds = np.zeros((self.batch_size,), dtype=np.bool_)
+        truncateds = np.zeros((self.batch_size,), dtype=np.bool_)
+        infos = {}
+        for row in range(self.batch_size):
+            (
+                env_ids[row],
+                observation,
+                rewards[row],
+                terminateds[row],
+                truncateds[row],
+                info,
+            ) = self._ready.popleft()
+            write_row(self.single_observation_space, self._batch, row, observation)
+            infos = self._add_info(infos, info, row)
+
+        return (
+            deepcopy(self._batch) if self.copy else self._batch,
+            rewards,
+            terminateds,
+            truncateds,
+            infos,
+            env_ids,
+        )
+
+    def close_extras(self, **kwargs) -> None:
+        # the simulators are stopped at once, rather than one after another
+        close_fleet(self.envs)
+
+    def _poll(
+        self, poller: zmq.Poller, pending: Dict[zmq.Socket, int]
+    ) -> List[zmq.Socket]:
+        # the sockets with a reply, along with those of the failed simulators
+        # (reading their reply raises the failure, see BaseAsaEnv.step_recv)
+        if not self._watchdog:
+            return [socket for socket, _ in poller.poll()]
+
+        ready = [socket for socket, _ in poller.poll(WATCHDOG_INTERVAL_MS)]
+        for socket, idx in pending.items():
+            if socket not in ready and self.envs[idx].simulator.failed:
+                ready.append(socket)
+        return ready
+
+    def _step_recv(self, env: BaseAsaEnv) -> Optional[tuple]:
+        # the standby simulators awaited by autoresets cannot be polled along
+        # with the sockets, they are waited for here
+        transition = env.step_recv()
+        while transition is None and env.awaited_standby is not None:
+            transition = env.step_recv()
+        return transition
+
+    def _start_reset(self, idx: int, flow: Generator) -> None:
+        self._resets[idx] = flow
+        self._advance_reset(idx)
+
+    def _advance_reset(self, idx: int) -> None:
+        try:
+            next(self._resets[idx])
+            while self.envs[idx].awaited_standby is not None:
+                # as in _step_recv
+                next(self._resets[idx])
+        except StopIteration as stop:
+            # the first observation of the episode
+            del self._resets[idx]
+            observation, info = stop.value
+            self._ready.append((idx, observation, 0.0, False, False, info))
+            return
+        self._wait(idx)
+
+    def _wait(self, idx: int) -> None:
+        # the socket may change on reset (see BaseAsaEnv.reset_flow)
+        socket = self.envs[idx].socket
+        self._waiting[socket] = idx
+        self._poller.register(socket, zmq.POLLIN)
+
+    def _write_observation(self, idx: int, observation: Any) -> None:
+        write_row(self.single_observation_space, self.observations, idx, observation)
@@ -0,0 +1,251 @@
+"""Routes the requests of learners to environments hosted on remote workers.
+
+Workers (see asagym.envs.remote) connect to the backend and register the env
+slots they host, each of which gets a global slot id. Learners connect to the
+frontend, attach to free slots and address them by id. A worker that stops
+sending heartbeats is considered dead, and the learners using its slots are
+told so. A learner keeps its slots until it detaches, or until it has sent
+nothing for the lease it attached with since it got them (a dead learner
+releases them so).
+
+Usage: python -m asagym.utils.broker [--frontend URL] [--backend URL]
+
+The payloads are pickled, so the broker must only be reachable from trusted
+hosts.
+"""
+
+import argparse
+import logging
+import pickle
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import zmq
+
+# the frames exchanged with learners (L) and workers (W)
+ATTACH = b"ATTACH"  # L => broker: number of slots, lease
+ATTACHED = b"ATTACHED"  # broker => L: slot ids and spaces
+DETACH = b"DETACH"  # L => broker
+READY = b"READY"  # W => broker: number of slots and spaces
+REQUEST = b"REQUEST"  # L => broker => W: slot, payload
+REPLY = b"REPLY"  # W => broker => L: slot, payload
+FAILED = b"FAILED"  # broker => L: slot, reason
+HEARTBEAT = b"HEARTBEAT"  # W <=> broker
+
+# seconds between heartbeats, and how many may be missed before giving up
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_LIVENESS = 3
+
+# seconds a learner keeps its slots without sending anything (e.g. while training)
+LEASE = 600.0
+
+
+class _Worker:
+    def __init__(self, identity: bytes, slots: List[int], spaces: bytes):
+        self.identity = identity
+        self.slots = slots  # the global id of each local slot
+        self.spaces = spaces  # pickled observation and action spaces
+        self.last_seen = time.monotonic()
+
+
+class _Learner:
+    def __init__(self, identity: bytes, lease: float):
+        self.identity = identity
+        self.lease = lease
+        self.last_seen = time.monotonic()
+
+
+class Broker:
+    """Binds the frontend (learners) and backend (workers) ROUTER sockets."""
+
+    def __init__(
+        self,
+        frontend: str = "tcp://*:5555",
+        backend: str = "tcp://*:5556",
+        context: Optional[zmq.Context] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.context = context or zmq.Context.instance()
+
+        self.frontend = self.context.socket(zmq.ROUTER)
+        self.frontend.bind(frontend)
+        self.backend = self.context.socket(zmq.ROUTER)
+        self.backend.bind(backend)
+
+        self._workers: Dict[bytes, _Worker] = {}
+        self._learners: Dict[bytes, _Learner] = {}
+        self._slots: Dict[int, Tuple[_Worker, int]] = {}  # id => worker, local id
+        self._owners: Dict[int, bytes] = {}  # id => learner using the slot
+        self._free: List[int] = []
+        self._attaching: Deque[Tuple[bytes, int]] = deque()  # learner, num slots
+        self._next_slot = 0
+        self._next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+
+    def run(self) -> None:
+        """Routes messages until the context is terminated (or interrupted)."""
+        poller = zmq.Poller()
+        poller.register(self.frontend, zmq.POLLIN)
+        poller.register(self.backend, zmq.POLLIN)
+
+        try:
+            while True:
+                events = dict(poller.poll(HEARTBEAT_INTERVAL * 1000))
+                if self.backend in events:
+                    self._handle_worker(self.backend.recv_multipart())
+                if self.frontend in events:
+                    self._handle_learner(self.frontend.recv_multipart())
+                self._heartbeat()
+        except (KeyboardInterrupt, zmq.ContextTerminated):
+            pass
+        finally:
+            self.frontend.close(linger=0)
+            self.backend.close(linger=0)
+
+    def _handle_worker(self, frames: List[bytes]) -> None:
+        identity, command = frames[0], frames[1]
+        worker = self._workers.get(identity)
+        if worker is not None:
+            worker.last_seen = time.monotonic()
+
+        if command == READY:
+            self._register(identity, int(frames[2]), frames[3])
+        elif command == REPLY and worker is not None:
+            slot = worker.slots[int(frames[2])]
+            owner = self._owners.get(slot)
+            if owner is not None:
+                self.frontend.send_multipart(
+                    [owner, REPLY, str(slot).encode(), frames[3]]
+                )
+        elif command != HEARTBEAT:
+            self.logger.warning(f"Unexpected {command} from worker {identity}")
+
+    def _handle_learner(self, frames: List[bytes]) -> None:
+        identity, command = frames[0], frames[1]
+        learner = self._learners.get(identity)
+        if learner is not None:
+            learner.last_seen = time.monotonic()
+
+        if command == REQUEST:
+            slot = int(frames[2])
+            if self._owners.get(slot) != identity:
+                self.frontend.send_multipart(
+                    [identity, FAILED, frames[2], b"slot not attached"]
+                )
+                return
+            worker, local = self._slots[slot]
+            self.backend.send_multipart(
+                [worker.identity, REQUEST, str(local).encode(), frames[3]]
+            )
+        elif command == ATTACH:
+            lease = float(frames[3]) if len(frames) > 3 else LEASE
+            self._learners[identity] = _Learner(identity, lease)
+            self._attaching.append((identity, int(frames[2])))
+            self._assign()
+        elif command == DETACH:
+            self._learners.pop(identity, None)
+            self._attaching = deque(
+                entry for entry in self._attaching if entry[0] != identity
+            )
+            self._detach(identity)
+        else:
+            self.logger.warning(f"Unexpected {command} from learner {identity}")
+
+    def _register(self, identity: bytes, num_slots: int, spaces: bytes) -> None:
+        if identity in self._workers:
+            self._remove(self._workers[identity], "worker registered again")
+
+        slots = list(range(self._next_slot, self._next_slot + num_slots))
+        self._next_slot += num_slots
+
+        worker = _Worker(identity, slots, spaces)
+        self._workers[identity] = worker
+        for local, slot in enumerate(slots):
+            self._slots[slot] = (worker, local)
+        self._free.extend(slots)
+        self.logger.info(f"Worker {identity} registered slots {slots}")
+
+        # learners may be waiting for these slots
+        self._assign()
+
+    def _assign(self) -> None:
+        while len(self._attaching) > 0:
+            identity, num_slots = self._attaching[0]
+            if len(self._free) < num_slots:
+                return
+            self._attaching.popleft()
+
+            # a learner attaching again gives its previous slots back
+            self._detach(identity)
+            slots, self._free = self._free[:num_slots], self._free[num_slots:]
+            for slot in slots:
+                self._owners[slot] = identity
+            # the lease starts with the slots
+            self._learners[identity].last_seen = time.monotonic()
+
+            spaces = self._slots[slots[0]][0].spaces
+            self.frontend.send_multipart(
+                [identity, ATTACHED, pickle.dumps(slots), spaces]
+            )
+            self.logger.info(f"Learner {identity} attached to slots {slots}")
+
+    def _detach(self, identity: bytes) -> None:
+        slots = [slot for slot, owner in self._owners.items() if owner == identity]
+        for slot in slots:
+            del self._owners[slot]
+        self._free.extend(slots)
+        self._free.sort()
+
+    def _remove(self, worker: _Worker, reason: str) -> None:
+        self.logger.warning(f"Removing worker {worker.identity}: {reason}")
+        del self._workers[worker.identity]
+        for slot in worker.slots:
+            del self._slots[slot]
+            owner = self._owners.pop(slot, None)
+            if owner is not None:
+                self.frontend.send_multipart(
+                    [owner, FAILED, str(slot).encode(), reason.encode()]
+                )
+        self._free = [slot for slot in self._free if slot in self._slots]
+
+    def _expire(self, learner: _Learner) -> None:
+        self.logger.warning(f"Detaching learner {learner.identity}: lease expired")
+        del self._learners[learner.identity]
+        self._detach(learner.identity)
+
+        # learners may be waiting for these slots
+        self._assign()
+
+    def _heartbeat(self) -> None:
+        now = time.monotonic()
+        for worker in list(self._workers.values()):
+            if now - worker.last_seen > HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS:
+                self._remove(worker, "worker stopped sending heartbeats")
+        # the learners waiting for slots are not expected to send anything
+        waiting = {identity for identity, _ in self._attaching}
+        for learner in list(self._learners.values()):
+            if learner.identity in waiting:
+                continue
+            if now - learner.last_seen > learner.lease:
+                self._expire(learner)
+
+        if now >= self._next_heartbeat:
+            for identity in self._workers:
+                self.backend.send_multipart([identity, HEARTBEAT])
+            self._next_heartbeat = now + HEARTBEAT_INTERVAL
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frontend", default="tcp://*:5555", help="for learners")
+    parser.add_argument("--backend", default="tcp://*:5556", help="for workers")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    Broker(args.frontend, args.backend).run()
+
+
+if __name__ == "__main__":
+    main()
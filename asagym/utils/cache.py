@@ -0,0 +1,70 @@
+from typing import Dict, Iterable, List, Optional
+
+import asagym.proto.simulator_pb2 as pb
+
+
+def clear_path(message, path: str) -> None:
+    """Resets the field at a dotted path (e.g. "owner.num_msl") to its default."""
+    parent, _, name = path.rpartition(".")
+    if parent:
+        for field in parent.split("."):
+            if not message.HasField(field):
+                # an unset message already holds the default values
+                return
+            message = getattr(message, field)
+    message.ClearField(name)
+
+
+class StateCache:
+    """The full states, reconstructed from the deltas replied by the simulator.
+
+    Every delta reply carries a sequence number, which must follow the one of
+    the previous reply. A gap means some deltas were lost and the cache must be
+    reloaded with the full states (see pb.SyncRequest).
+    """
+
+    def __init__(self):
+        self.sequence: Optional[int] = None
+        self._states: Dict[int, pb.State] = {}
+        self._ordered: List[pb.State] = []
+
+    @property
+    def states(self) -> List[pb.State]:
+        """The cached states, in the order the simulator first reported them."""
+        return self._ordered
+
+    def load(self, states: Iterable[pb.State], sequence: int) -> None:
+        """Replaces the cache with full states."""
+        self._states = {}
+        self._ordered = []
+        for state in states:
+            cached = pb.State()
+            cached.CopyFrom(state)
+            self._states[cached.id] = cached
+            self._ordered.append(cached)
+        self.sequence = sequence
+
+    def follows(self, sequence: int) -> bool:
+        """Whether a reply with the given sequence can be applied to the cache."""
+        return self.sequence is not None and sequence == self.sequence + 1
+
+    def advance(self, sequence: int) -> None:
+        self.sequence = sequence
+
+    def apply(self, deltas: Iterable[pb.StateDelta]) -> List[pb.State]:
+        """Updates the cached states in place, returning them."""
+        for delta in deltas:
+            cached = self._states.get(delta.id)
+            if cached is None:
+                cached = pb.State(id=delta.id)
+                self._states[delta.id] = cached
+                self._ordered.append(cached)
+
+            # the foes are always sent as a whole
+            if len(delta.state.foes) > 0:
+                del cached.foes[:]
+            cached.MergeFrom(delta.state)
+
+            for path in delta.cleared.paths:
+                clear_path(cached, path)
+        return self._ordered
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from google.protobuf.message import Message
+from gymnasium.spaces import Box, Dict as SpaceDict, Space
+
+import asagym.proto.simulator_pb2 as pb
+
+
+class _Segment:
+    # the leaves of one key of the observation, all read from the same message
+    def __init__(self, key: str, source: str, fields: List[str], start: int):
+        self.key = key
+        self.fields = fields  # relative to the source message
+        self.slice = slice(start, start + len(fields))
+        # the path of the source (indexes of repeated fields are integers)
+        self.path: List[Union[str, int]] = [
+            int(name) if name.isdigit() else name for name in source.split(".") if name
+        ]
+        self.getter = attrgetter(*fields)
+
+    def source(self, state: pb.State) -> Optional[Message]:
+        message = state
+        for name in self.path:
+            if isinstance(name, int):
+                if name >= len(message):
+                    return None
+                message = message[name]
+            else:
+                message = getattr(message, name)
+        return message
+
+
+class StateCodec:
+    """Reads the observations of States into a reused flat vector.
+
+    Compiled once from a Dict observation space whose leaves are scalar Boxes
+    named after the State fields: each key of the observation is read from the
+    message at its source path (e.g. "foe" from "foes.0"), with a single C-level
+    getter per key. The layout of the vector is the one of gymnasium's
+    `flatten`, so that both modes of an env hold the same values.
+
+    A source missing from the State (e.g. no foe reported) leaves its values as
+    they were, those of the last observation.
+    """
+
+    def __init__(
+        self,
+        space: SpaceDict,
+        sources: Dict[str, str],
+        dtype: np.dtype = np.float64,
+    ):
+        self.space = space
+        self.dtype = np.dtype(dtype)
+        self._segments: List[_Segment] = []
+
+        # the leaves in order: their keys (from the root) and dtypes
+        self._leaves: List[Tuple[Tuple[str, ...], np.dtype]] = []
+        lows: List[float] = []
+        highs: List[float] = []
+
+        for key, subspace in space.spaces.items():
+            if key not in sources:
+                raise ValueError(f"No source for the observation key {key}")
+
+            leaves = list(self._walk(subspace, ()))
+            if len(leaves) == 1 and leaves[0][0] == ():
+                # a leaf at the root, its source is the field itself
+                parent, _, name = sources[key].rpartition(".")
+                fields, source = [name], parent
+            else:
+                fields, source = [".".join(path) for path, _ in leaves], sources[key]
+
+            self._segments.append(_Segment(key, source, fields, len(self._leaves)))
+            for path, box in leaves:
+                self._leaves.append(((key,) + path, box.dtype))
+                lows.append(box.low.item())
+                highs.append(box.high.item())
+
+        self.size = len(self._leaves)
+        self.flat_space = Box(
+            low=np.array(lows, dtype=self.dtype),
+            high=np.array(highs, dtype=self.dtype),
+            dtype=self.dtype,
+        )
+        self.buffer = np.zeros((self.size,), dtype=self.dtype)
+
+    def _walk(self, space: Space, path: Tuple[str, ...]):
+        if isinstance(space, SpaceDict):
+            for key, subspace in space.spaces.items():
+                yield from self._walk(subspace, path + (key,))
+        elif isinstance(space, Box) and space.shape in ((), (1,)):
+            yield path, space
+        else:
+            raise ValueError(f"Only scalar Boxes can be read from States, not {space}")
+
+    def segment(self, key: str) -> Tuple[slice, List[str]]:
+        """The slice of the vector holding a key, and its fields (in order)."""
+        for segment in self._segments:
+            if segment.key == key:
+                return segment.slice, segment.fields
+        raise KeyError(key)
+
+    def encode(self, state: pb.State) -> np.ndarray:
+        """Reads the State into the vector, which is overwritten by the next call."""
+        buffer = self.buffer
+        for segment in self._segments:
+            message = segment.source(state)
+            if message is not None:
+                buffer[segment.slice] = segment.getter(message)
+        return buffer
+
+    def unflatten(self, vector: np.ndarray) -> OrderedDict:
+        """The Dict observation held by a vector, as 0-d views of it.
+
+        Leaves with another dtype than the vector (e.g. integers) are copies.
+        """
+        observation = OrderedDict()
+        for idx, (path, dtype) in enumerate(self._leaves):
+            node = observation
+            for key in path[:-1]:
+                node = node.setdefault(key, OrderedDict())
+
+            value = vector[idx : idx + 1].reshape(())
+            node[path[-1]] = value if dtype == vector.dtype else value.astype(dtype)
+        return observation
@@ -4,49 +4,142 @@ from zmq.sugar.socket import Socket
 
 import asagym.proto.simulator_pb2 as pb
 
+# the reply expected for each type of request
+REPLY_TYPES = {
+    pb.INIT: pb.InitResponse,
+    pb.RESET: pb.ResetResponse,
+    pb.STEP: pb.StepResponse,
+    pb.CLOSE: pb.CloseResponse,
+    pb.SYNC: pb.SyncResponse,
+}
 
-def send_message_to_simulation(socket: Socket, message: Message) -> None:
-    """Sends the response to the simulator.
+# the envelope field carrying each type of request (pb.ONEOF wire format)
+REQUEST_FIELDS = {
+    pb.InitRequest: "init",
+    pb.ResetRequest: "reset",
+    pb.StepRequest: "step",
+    pb.CloseRequest: "close",
+    pb.SyncRequest: "sync",
+}
 
-    Blocking communication pattern. The message is generic.
+# the envelope field carrying each type of reply (pb.ONEOF wire format)
+REPLY_FIELDS = {
+    pb.INIT: "init",
+    pb.RESET: "reset",
+    pb.STEP: "step",
+    pb.CLOSE: "close",
+    pb.SYNC: "sync",
+}
+
+
+def encode_request(
+    message: Message,
+    wire_format: pb.WireFormat = pb.ANY,
+    session: int = 0,
+) -> bytes:
+    """Serializes a request of a session into the envelope of the given wire format.
+
+    With pb.ONEOF, the request may also be given already inside a pb.Request.
     """
+    if wire_format == pb.ONEOF:
+        if isinstance(message, pb.Request):
+            return message.SerializeToString()
+        request = pb.Request()
+        getattr(request, REQUEST_FIELDS[type(message)]).CopyFrom(message)
+        request.session = session
+        return request.SerializeToString()
+
     # multiplex the message into Any
     any_request = Any()
     any_request.Pack(message)
 
-    # send message through zmq socket
-    request_message = pb.RequestMessage(payload=any_request)
-    socket.send(request_message.SerializeToString())
+    request_message = pb.RequestMessage(payload=any_request, session=session)
+    return request_message.SerializeToString()
 
 
-def recv_message_from_simulation(
-    socket: Socket, msg_type: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET
-) -> pb.InitResponse | pb.ResetResponse | pb.StepResponse | pb.CloseResponse:
-    """Waits for the response from the simulator and demultiplexes it according to given type.
+def decode_response(
+    buffer: bytes | memoryview,
+    msg_type: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET | pb.SYNC,
+    wire_format: pb.WireFormat = pb.ANY,
+    session: int = 0,
+) -> (
+    pb.InitResponse
+    | pb.ResetResponse
+    | pb.StepResponse
+    | pb.CloseResponse
+    | pb.SyncResponse
+):
+    """Parses a reply of a session from the envelope of the given wire format.
 
-    Blocking communication pattern. The response is generic, matching the type argument.
+    The messages are always new ones: upb messages that are cleared and parsed
+    again keep growing their arena, without bound.
     """
-
-    # receive message through zmq socket
-    reply_message = pb.ResponseMessage()
-    reply_message.ParseFromString(socket.recv())
-
-    # demultiplex the message according to expected type
-    if msg_type == pb.INIT:
-        reply = pb.InitResponse()
-    elif msg_type == pb.RESET:
-        reply = pb.ResetResponse()
-    elif msg_type == pb.STEP:
-        reply = pb.StepResponse()
-    elif msg_type == pb.CLOSE:
-        reply = pb.CloseResponse()
-    else:
+    if msg_type not in REPLY_TYPES:
         raise Exception(
             msg_type,
-            "not valid, should be one of: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET",
+            "not valid, should be one of: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET | pb.SYNC",
         )
 
+    if wire_format == pb.ONEOF:
+        # the reply is parsed in place, as a field of the envelope
+        reply_message = pb.Response()
+        reply_message.ParseFromString(buffer)
+        check_session(reply_message, session)
+
+        field = reply_message.WhichOneof("payload")
+        expected = REPLY_FIELDS[msg_type]
+        if field != expected:
+            raise Exception(field, f"unexpected reply, should be: {expected}")
+        return getattr(reply_message, field)
+
+    reply_message = pb.ResponseMessage()
+    reply = REPLY_TYPES[msg_type]()
+    reply_message.ParseFromString(buffer)
+    check_session(reply_message, session)
+
     # unpack the message with expected type
-    any_reply = reply_message.payload
-    any_reply.Unpack(reply)
+    reply_message.payload.Unpack(reply)
     return reply
+
+
+def check_session(envelope: pb.Response | pb.ResponseMessage, session: int) -> None:
+    # simulators without sessions always reply session 0
+    if envelope.session != session:
+        raise Exception(envelope.session, f"unexpected session, should be: {session}")
+
+
+def send_message_to_simulation(
+    socket: Socket,
+    message: Message,
+    wire_format: pb.WireFormat = pb.ANY,
+    session: int = 0,
+) -> None:
+    """Sends the response to the simulator.
+
+    Blocking communication pattern. The message is generic.
+    """
+    # send message through zmq socket
+    socket.send(encode_request(message, wire_format, session=session))
+
+
+def recv_message_from_simulation(
+    socket: Socket,
+    msg_type: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET | pb.SYNC,
+    wire_format: pb.WireFormat = pb.ANY,
+    session: int = 0,
+) -> (
+    pb.InitResponse
+    | pb.ResetResponse
+    | pb.StepResponse
+    | pb.CloseResponse
+    | pb.SyncResponse
+):
+    """Waits for the response from the simulator and demultiplexes it according to given type.
+
+    Blocking communication pattern. The response is generic, matching the type argument.
+    The message is parsed straight from the zmq frame (no copy into a bytes object).
+    """
+
+    # receive message through zmq socket
+    frame = socket.recv(copy=False)
+    return decode_response(frame.buffer, msg_type, wire_format, session=session)
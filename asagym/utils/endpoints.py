@@ -0,0 +1,99 @@
+import fcntl
+import os
+import pathlib
+import socket
+import threading
+from typing import Dict
+
+
+def is_port_free(port: int) -> bool:
+    """Checks whether a loopback tcp port can be bound right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+class EndpointAllocator:
+    """Claims simulator endpoints that no other process on the machine is using.
+
+    Each endpoint is guarded by a lock file under base_path/var/run, locked with
+    `flock` for as long as the endpoint is claimed. The operating system drops
+    the lock when its owner dies, so crashed jobs never leak endpoints.
+    """
+
+    def __init__(
+        self,
+        base_path: pathlib.Path,
+        transport: str = "tcp",
+        first_port: int = 8000,
+        max_endpoints: int = 4096,
+    ):
+        if transport not in ("tcp", "ipc"):
+            raise ValueError(f"unsupported transport: {transport}")
+
+        self.transport = transport
+        self.first_port = first_port
+        self.max_endpoints = max_endpoints
+
+        self.run_path = base_path.absolute().joinpath("./var/run")
+        os.makedirs(self.run_path, exist_ok=True)
+
+        self._claims: Dict[str, int] = {}  # endpoint => fd of its lock file
+        self._lock = threading.Lock()
+
+    def claim(self) -> str:
+        """Atomically claims a free endpoint, returning its zmq url."""
+        with self._lock:
+            for idx in range(self.max_endpoints):
+                endpoint, lock_path = self._candidate(idx)
+                if endpoint in self._claims:
+                    continue
+
+                fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # claimed by another process
+                    os.close(fd)
+                    continue
+
+                port = self.first_port + idx
+                if self.transport == "tcp" and not is_port_free(port):
+                    # in use by a process that does not know about the lock files
+                    os.close(fd)
+                    continue
+
+                # the owner pid is written only to ease debugging
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{os.getpid()}\n".encode())
+
+                self._claims[endpoint] = fd
+                return endpoint
+
+        raise RuntimeError(f"no free {self.transport} endpoint in {self.run_path}")
+
+    def release(self, endpoint: str) -> None:
+        """Releases a claimed endpoint (closing the lock file drops the lock)."""
+        with self._lock:
+            fd = self._claims.pop(endpoint, None)
+            if fd is not None:
+                os.close(fd)
+
+    def close(self) -> None:
+        for endpoint in list(self._claims.keys()):
+            self.release(endpoint)
+
+    def _candidate(self, idx: int):
+        if self.transport == "tcp":
+            port = self.first_port + idx
+            return (
+                f"tcp://127.0.0.1:{port}",
+                self.run_path.joinpath(f"./port-{port}.lock"),
+            )
+        return (
+            f"ipc://{self.run_path.joinpath(f'AsaGym-slot-{idx}.ipc')}",
+            self.run_path.joinpath(f"./AsaGym-slot-{idx}.lock"),
+        )
@@ -0,0 +1,125 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+import asagym.proto.simulator_pb2 as pb
+
+# the columns of PackedStates.players (field paths of pb.State)
+PLAYER_FIELDS = (
+    "id",
+    "side",
+    "exec_time",
+    "active",
+    "owner.player_state.id",
+    "owner.player_state.latitude",
+    "owner.player_state.longitude",
+    "owner.player_state.altitude",
+    "owner.player_state.heading",
+    "owner.player_state.airspeed",
+    "owner.base_altitude",
+    "owner.fuel_amount",
+    "owner.num_msl",
+    "owner.tgt_id",
+    "wing.player_state.id",
+    "wing.tgt_id",
+    "wing.is_engaged",
+    "wing.is_defending",
+)
+
+# the columns of PackedStates.foes (field paths of pb.FoeState)
+FOE_FIELDS = (
+    "observer_id",
+    "player_state.id",
+    "player_state.latitude",
+    "player_state.longitude",
+    "player_state.altitude",
+    "player_state.heading",
+    "player_state.airspeed",
+    "true_azmth",
+    "rel_azmth",
+    "range",
+    "wez_own2foe_max",
+    "wez_own2foe_nez",
+    "wez_foe2own_max",
+    "wez_foe2own_nez",
+    "is_active_emitter",
+)
+
+PACKED_DTYPE = np.dtype("<f8")
+
+
+def default_schema() -> pb.StateSchema:
+    return pb.StateSchema(player_fields=PLAYER_FIELDS, foe_fields=FOE_FIELDS)
+
+
+def _get_path(message, path: str) -> float:
+    for name in path.split("."):
+        message = getattr(message, name)
+    return message
+
+
+def pack_states(states: Sequence[pb.State], schema: pb.StateSchema) -> pb.PackedStates:
+    """Packs the numeric fields of the states (reference, simulator side encoder)."""
+    players = [
+        [_get_path(state, path) for path in schema.player_fields] for state in states
+    ]
+    foes = [
+        [
+            state.id if path == "observer_id" else _get_path(foe, path)
+            for path in schema.foe_fields
+        ]
+        for state in states
+        for foe in state.foes
+    ]
+    return pb.PackedStates(
+        num_players=len(players),
+        players=np.array(players, dtype=PACKED_DTYPE).tobytes(),
+        num_foes=len(foes),
+        foes=np.array(foes, dtype=PACKED_DTYPE).tobytes(),
+    )
+
+
+class StateColumns:
+    """Packed states decoded as NumPy matrices (no per-field Python calls).
+
+    `players` has one row per pb.State and `foes` one row per reported foe, with
+    the columns given by the schema agreed with the simulator.
+    """
+
+    def __init__(self, schema: pb.StateSchema):
+        self.player_fields: List[str] = list(schema.player_fields)
+        self.foe_fields: List[str] = list(schema.foe_fields)
+        self.player_index: Dict[str, int] = {
+            name: idx for idx, name in enumerate(self.player_fields)
+        }
+        self.foe_index: Dict[str, int] = {
+            name: idx for idx, name in enumerate(self.foe_fields)
+        }
+
+        self.players = np.empty((0, len(self.player_fields)), dtype=PACKED_DTYPE)
+        self.foes = np.empty((0, len(self.foe_fields)), dtype=PACKED_DTYPE)
+
+    def decode(self, packed: pb.PackedStates) -> None:
+        self.players = np.frombuffer(packed.players, dtype=PACKED_DTYPE).reshape(
+            packed.num_players, len(self.player_fields)
+        )
+        self.foes = np.frombuffer(packed.foes, dtype=PACKED_DTYPE).reshape(
+            packed.num_foes, len(self.foe_fields)
+        )
+
+    def player_columns(self, names: Sequence[str]) -> np.ndarray:
+        """The indexes of the given player fields (to gather many at once)."""
+        return np.array([self.player_index[name] for name in names], dtype=np.intp)
+
+    def foe_columns(self, names: Sequence[str]) -> np.ndarray:
+        """The indexes of the given foe fields (to gather many at once)."""
+        return np.array([self.foe_index[name] for name in names], dtype=np.intp)
+
+    def player_row(self, player_id: int) -> int:
+        rows = np.flatnonzero(self.players[:, self.player_index["id"]] == player_id)
+        return int(rows[0])
+
+    def foe_rows(self, observer_id: int) -> np.ndarray:
+        return np.flatnonzero(
+            self.foes[:, self.foe_index["observer_id"]] == observer_id
+        )
@@ -1,43 +1,104 @@
-from typing import List
+from operator import attrgetter
+from typing import Dict, Iterator, KeysView, List, Tuple
+
+import numpy as np
 
 import asagym.proto.simulator_pb2 as pb
 
+# the PlayerState fields held by a TeamState, in the order of its columns
+PLAYER_FIELDS = ("latitude", "longitude", "altitude", "heading", "airspeed")
 
-def merge_observations(observations: List[pb.State], cur_sum: pb.Summary) -> pb.Summary:
-    new_sum = pb.Summary()
-    new_sum.MergeFrom(cur_sum)
+_read_player = attrgetter(*PLAYER_FIELDS)
 
-    #
-    # For now, just replace with the new information
-    # TODO: improve this (perhaps state estimation with Kalman Filter)
-    #
 
-    for obs in observations:
-        if obs.side == pb.BLUE:
-            # owner of blue team
-            owner_state = obs.owner.player_state
-            state = new_sum.own_team.get_or_create(owner_state.id)
-            state.MergeFrom(owner_state)
-        elif obs.side == pb.RED:
-            # owner of red team
+class TeamState:
+    """The last known PlayerStates of a team, one row of `values` per player.
+
+    Rows are given to the players as they are first seen and kept until the
+    table is cleared, so that updating a known player allocates nothing. Reads
+    through `items` and `[id]` build PlayerStates, as the maps of a Summary.
+    """
+
+    def __init__(self, capacity: int = 4):
+        self.ids = np.zeros((capacity,), dtype=np.int32)
+        self.values = np.zeros((capacity, len(PLAYER_FIELDS)), dtype=np.float64)
+        self.rows: Dict[int, int] = {}  # id => row
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self.rows
+
+    def __getitem__(self, id: int) -> pb.PlayerState:
+        return self._message(id, self.rows[id])
+
+    def keys(self) -> KeysView[int]:
+        return self.rows.keys()
+
+    def items(self) -> Iterator[Tuple[int, pb.PlayerState]]:
+        for id, row in self.rows.items():
+            yield id, self._message(id, row)
+
+    def row(self, id: int) -> np.ndarray:
+        """The values of a player (a view, updated in place)."""
+        return self.values[self.rows[id]]
+
+    def write(self, id: int, values: Tuple[float, ...]) -> None:
+        row = self.rows.get(id)
+        if row is None:
+            row = self._add(id)
+        self.values[row] = values
+
+    def clear(self) -> None:
+        self.rows.clear()
+
+    def _add(self, id: int) -> int:
+        row = len(self.rows)
+        if row == len(self.ids):
+            # doubling the capacity, the players seen so far keep their rows
+            self.ids = np.resize(self.ids, (2 * row,))
+            self.values = np.resize(self.values, (2 * row, len(PLAYER_FIELDS)))
+        self.ids[row] = id
+        self.rows[id] = row
+        return row
+
+    def _message(self, id: int, row: int) -> pb.PlayerState:
+        fields = dict(zip(PLAYER_FIELDS, self.values[row].tolist()))
+        return pb.PlayerState(id=id, **fields)
+
+
+class TeamTable:
+    """The summary of both teams, updated in place.
+
+    Holds the same PlayerStates as a Summary, without copying it on every
+    update: each State writes the row of its owner, so that an update costs
+    one getter per player. The Summary itself is only built by `to_summary`.
+    """
+
+    def __init__(self, capacity: int = 4):
+        self.own_team = TeamState(capacity)
+        self.ene_team = TeamState(capacity)
+
+    def update(self, observations: List[pb.State]) -> None:
+        for obs in observations:
+            if obs.side == pb.BLUE:
+                team = self.own_team
+            elif obs.side == pb.RED:
+                team = self.ene_team
+            else:
+                continue
             owner_state = obs.owner.player_state
-            state = new_sum.ene_team.get_or_create(owner_state.id)
-            state.MergeFrom(owner_state)
-
-    # for obs in observations:
-    #     # owner
-    #     owner_state = obs.owner.player_state
-    #     state = new_sum.own_team.get_or_create(owner_state.id)
-    #     state.MergeFrom(owner_state)
-    #
-    #     # wing
-    #     wing_state = obs.wing.player_state
-    #     state = new_sum.own_team.get_or_create(wing_state.id)
-    #     state.MergeFrom(owner_state)
-    #
-    #     # foes
-    #     for foe in obs.foes:
-    #         state = new_sum.ene_team.get_or_create(foe.player_state.id)
-    #         state.MergeFrom(foe.player_state)
-
-    return new_sum
+            team.write(owner_state.id, _read_player(owner_state))
+
+    def clear(self) -> None:
+        self.own_team.clear()
+        self.ene_team.clear()
+
+    def to_summary(self) -> pb.Summary:
+        summary = pb.Summary()
+        for id, state in self.own_team.items():
+            summary.own_team[id].CopyFrom(state)
+        for id, state in self.ene_team.items():
+            summary.ene_team[id].CopyFrom(state)
+        return summary
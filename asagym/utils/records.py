@@ -0,0 +1,136 @@
+from operator import attrgetter
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
+
+import asagym.proto.simulator_pb2 as pb
+from asagym.utils.packing import StateColumns
+
+# the NumPy type of each scalar protobuf type (strings are not recorded)
+_SCALAR_TYPES = {
+    FieldDescriptor.CPPTYPE_INT32: np.int32,
+    FieldDescriptor.CPPTYPE_INT64: np.int64,
+    FieldDescriptor.CPPTYPE_UINT32: np.uint32,
+    FieldDescriptor.CPPTYPE_UINT64: np.uint64,
+    FieldDescriptor.CPPTYPE_DOUBLE: np.float64,
+    FieldDescriptor.CPPTYPE_FLOAT: np.float32,
+    FieldDescriptor.CPPTYPE_BOOL: np.bool_,
+    FieldDescriptor.CPPTYPE_ENUM: np.int32,
+}
+
+
+class _Reader:
+    # reads the scalar fields of a message (nested messages included) as one
+    # tuple, each message being resolved once: its own fields first, then those
+    # of its messages, in the order of the descriptor
+    def __init__(self, descriptor: Descriptor, prefix: str = ""):
+        names = [
+            field.name
+            for field in descriptor.fields
+            if field.label != FieldDescriptor.LABEL_REPEATED
+            and field.cpp_type in _SCALAR_TYPES
+        ]
+        self.fields: List[Tuple[str, type]] = [
+            (prefix + field.name, _SCALAR_TYPES[field.cpp_type])
+            for field in descriptor.fields
+            if field.name in names
+        ]
+        self._getter = attrgetter(*names)
+        self._single = len(names) == 1
+
+        self._children: List[Tuple[attrgetter, _Reader]] = []
+        for field in descriptor.fields:
+            if (
+                field.label != FieldDescriptor.LABEL_REPEATED
+                and field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+            ):
+                reader = _Reader(field.message_type, f"{prefix}{field.name}.")
+                self._children.append((attrgetter(field.name), reader))
+                self.fields.extend(reader.fields)
+
+    def __call__(self, message: Message) -> tuple:
+        values = self._getter(message)
+        if self._single:
+            values = (values,)
+        for getter, reader in self._children:
+            values += reader(getter(message))
+        return values
+
+
+_read_state = _Reader(pb.State.DESCRIPTOR)
+_read_foe = _Reader(pb.FoeState.DESCRIPTOR)
+
+# a record of every pb.State (OwnState and WingState included) and of every
+# reported pb.FoeState, named after the field paths (as in packing)
+STATE_DTYPE = np.dtype(_read_state.fields)
+FOE_DTYPE = np.dtype([("observer_id", np.int32)] + _read_foe.fields)
+
+
+class StateRecords:
+    """The States of a tick as NumPy structured arrays, decoded in bulk.
+
+    `players` has one record per pb.State and `foes` one per reported foe (with
+    the id of the State reporting it as `observer_id`), with the fields of
+    STATE_DTYPE and FOE_DTYPE (e.g. `players["owner.player_state.latitude"]`).
+    Both are views of buffers reused by the next decode, which only allocates
+    when more players or foes are reported than ever before.
+
+    Strings (the end of episode and the emitter modes) stay in the messages.
+
+    Meant for the code reading most fields of every State (e.g. a reward or a
+    recorder, see StateRecorder): the envs gather the few fields of their
+    observations from the messages (or the packed columns) more cheaply.
+    """
+
+    def __init__(self, capacity: int = 8):
+        self._players = np.zeros((capacity,), dtype=STATE_DTYPE)
+        self._foes = np.zeros((capacity,), dtype=FOE_DTYPE)
+        self.players = self._players[:0]
+        self.foes = self._foes[:0]
+
+    def decode(self, states: Sequence[pb.State]) -> None:
+        """Reads the records of the states, one C-level getter per message."""
+        players = self._reserve_players(len(states))
+        players[:] = [_read_state(state) for state in states]
+
+        foes = []
+        for state in states:
+            observer = (state.id,)
+            foes.extend(observer + _read_foe(foe) for foe in state.foes)
+        self._reserve_foes(len(foes))[:] = foes
+
+    def decode_columns(self, columns: StateColumns) -> None:
+        """Reads the records of packed states (the fields out of the schema are
+        left zeroed)."""
+        players = self._reserve_players(len(columns.players))
+        players[:] = 0
+        for name, idx in columns.player_index.items():
+            if name in STATE_DTYPE.fields:
+                players[name] = columns.players[:, idx]
+
+        foes = self._reserve_foes(len(columns.foes))
+        foes[:] = 0
+        for name, idx in columns.foe_index.items():
+            if name in FOE_DTYPE.fields:
+                foes[name] = columns.foes[:, idx]
+
+    def player_row(self, player_id: int) -> int:
+        return int(np.flatnonzero(self.players["id"] == player_id)[0])
+
+    def foes_of(self, observer_id: int) -> np.ndarray:
+        """The records of the foes reported by a player (a copy)."""
+        return self.foes[self.foes["observer_id"] == observer_id]
+
+    def _reserve_players(self, count: int) -> np.ndarray:
+        if count > len(self._players):
+            self._players = np.zeros((2 * count,), dtype=STATE_DTYPE)
+        self.players = self._players[:count]
+        return self.players
+
+    def _reserve_foes(self, count: int) -> np.ndarray:
+        if count > len(self._foes):
+            self._foes = np.zeros((2 * count,), dtype=FOE_DTYPE)
+        self.foes = self._foes[:count]
+        return self.foes
@@ -1,11 +1,12 @@
 from importlib.resources import files
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
 import pygame
 
 import asagym.proto.simulator_pb2 as pb
 
 from .drawing import SCREEN_WIDTH, DrawingUtils, Pose, Vector2, deg2pix
+from .preprocessing import TeamTable
 
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
@@ -120,7 +121,7 @@ class Simulation:
         self.fighter_planes: Dict[int, Plane] = dict()
         self.enemy_planes: Dict[int, Plane] = dict()
 
-    def reset(self, summary: pb.Summary):
+    def reset(self, summary: Union[pb.Summary, TeamTable]):
         """
         Resets the simulation.
 
@@ -136,7 +137,7 @@ class Simulation:
                 self.enemy_planes[id] = Plane(self.center_map, "red")
             self.enemy_planes[id].reset(state)
 
-    def update(self, summary: pb.Summary):
+    def update(self, summary: Union[pb.Summary, TeamTable]):
         """
         Updates the simulation.
         """
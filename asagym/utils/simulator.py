@@ -0,0 +1,733 @@
+import os
+import pathlib
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger, getLogger
+from queue import Queue
+from subprocess import DEVNULL, Popen, TimeoutExpired
+from typing import (
+    Callable,
+    Deque,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import zmq
+import zmq.asyncio
+from google.protobuf.field_mask_pb2 import FieldMask
+from google.protobuf.message import Message
+
+import asagym.proto.simulator_pb2 as pb
+from asagym.utils.communication import (
+    decode_response,
+    encode_request,
+    recv_message_from_simulation,
+    send_message_to_simulation,
+)
+from asagym.utils.endpoints import EndpointAllocator, is_port_free
+
+# the ids of simulator instances sharing the same rank are apart by this amount
+STANDBY_ID_STRIDE = 1000
+
+# the port of AsaGym in its docker container, published at the host port
+# DOCKER_HOST_PORT + id (unless the endpoint is allocated)
+DOCKER_CONTAINER_PORT = 50051
+DOCKER_HOST_PORT = 50051
+
+# how often a reply awaited with a timeout checks that the simulator is alive
+WATCHDOG_INTERVAL_MS = 100
+
+# seconds given to a simulator to reply Close and exit, and then to exit once
+# terminated (before being killed), see `shutdown`
+CLOSE_TIMEOUT = 5.0
+TERMINATE_GRACE = 2.0
+
+
+class SimulatorFailure(RuntimeError):
+    """The simulator has exited, or has not replied a request in time."""
+
+
+def resolve_endpoint(
+    endpoint: Optional[str], base_path: pathlib.Path, sim_id: int
+) -> str:
+    """Builds the zmq endpoint used to reach the simulator with the given id.
+
+    The endpoint may be None or "tcp" (loopback TCP at port 8000 + id), "ipc"
+    (a unix domain socket under base_path/var/run) or a full zmq endpoint, which
+    may contain an "{id}" placeholder.
+    """
+    if endpoint is None or endpoint == "tcp":
+        return "tcp://127.0.0.1:" + str(8000 + sim_id)
+
+    if endpoint == "ipc":
+        run_path = base_path.absolute().joinpath("./var/run")
+        os.makedirs(run_path, exist_ok=True)
+        return f"ipc://{run_path.joinpath(f'AsaGym-{sim_id}.ipc')}"
+
+    return endpoint.format(id=sim_id)
+
+
+class SimulatorInstance:
+    """An AsaGym process along with the socket used to talk to it."""
+
+    def __init__(
+        self,
+        context: zmq.Context,
+        base_path: pathlib.Path,
+        sim_id: int,
+        use_docker: bool,
+        logger: Logger,
+        wire_format: pb.WireFormat = pb.ONEOF,
+        endpoint: Optional[str] = None,
+        allocator: Optional[EndpointAllocator] = None,
+        packed_states: bool = False,
+        delta_states: bool = False,
+        state_mask: Optional[FieldMask] = None,
+        session: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        init_timeout: Optional[float] = None,
+    ):
+        self.context = context
+        self.base_path = base_path
+        self.sim_id = sim_id  # the id given to AsaGym (it defines the default port)
+        self.use_docker = use_docker
+        self.logger = logger
+
+        self.node: Optional[Popen] = None
+        self.uuid: Optional[uuid.UUID] = None
+        self.scenario: Optional[tuple] = None  # key of the loaded scenario
+
+        # the Init reply is still awaited (see start and wait_ready)
+        self.starting = False
+        # the Close reply is still awaited (see shutdown and stop_flow)
+        self.closing = False
+        # a request has been sent and its reply not read yet
+        self.pending = False
+        # ready, but no episode has been run yet
+        self.fresh = False
+        # when the process was spawned and how long it took to be ready (seconds)
+        self.started_at: Optional[float] = None
+        self.cold_start: Optional[float] = None
+
+        # seconds to wait for each reply, and for the Init one (which defaults
+        # to the former), forever if None
+        self.request_timeout = request_timeout
+        self.init_timeout = request_timeout if init_timeout is None else init_timeout
+        self._sent_at = 0.0  # when the request in flight was sent
+
+        # the format proposed at Init and the one agreed by the simulator
+        self.preferred_wire_format = wire_format
+        self.wire_format = pb.ANY
+
+        # the columns of the packed states (None if not requested or unsupported)
+        self.packed_states = packed_states
+        self.schema: Optional[pb.StateSchema] = None
+
+        # whether Step replies carry only the changes of the states (if accepted)
+        self.delta_states = delta_states
+        self.delta = False
+
+        # the State fields to be replied (all of them if None)
+        self.state_mask = state_mask
+
+        # the session of a shared simulator process (see SessionHost), which is
+        # then neither spawned nor killed by this instance
+        self.hosted = session is not None
+        self.session = session if session is not None else 0
+        self._session_open = False
+
+        # traffic received from the simulator
+        self.bytes_received = 0
+        self.messages_received = 0
+
+        # checked before claiming an endpoint, which would be leaked otherwise
+        # (with an allocator, the endpoint only names the transport)
+        if self.use_docker and endpoint is not None and allocator is None:
+            raise ValueError("custom endpoints are not supported with docker")
+        if self.use_docker and allocator is not None and allocator.transport != "tcp":
+            raise ValueError("docker simulators are only reachable through tcp")
+
+        # the default endpoint is the one AsaGym derives from its id
+        self.allocator = allocator
+        self.custom_endpoint = endpoint is not None or allocator is not None
+        if allocator is not None:
+            self.endpoint = allocator.claim()
+        else:
+            self.endpoint = resolve_endpoint(endpoint, base_path, sim_id)
+
+        # the host port published by the docker container (the claimed one, if
+        # the endpoint is allocated)
+        self.docker_port = DOCKER_HOST_PORT + sim_id
+        if self.use_docker and allocator is not None:
+            self.docker_port = int(self.endpoint.rpartition(":")[2])
+
+        self.socket = context.socket(zmq.REQ)
+        self.socket.connect(self.endpoint)
+
+        # the same socket, to await replies on asyncio event loops
+        self._async_socket: Optional[zmq.asyncio.Socket] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the simulator (or the session) has been started and not stopped."""
+        return self.node is not None or self._session_open
+
+    @property
+    def alive(self) -> bool:
+        if self.hosted:
+            return self._session_open
+        return self.node is not None and self.node.poll() is None
+
+    @property
+    def state(self) -> str:
+        """The stage of the lifecycle of the simulator, for logs and debugging.
+
+        One of "stopped", "starting" (until the Init reply), "ready" (no episode
+        run yet), "running" and "closing" (until the Close reply).
+        """
+        if not self.running:
+            return "stopped"
+        if self.starting:
+            return "starting"
+        if self.closing:
+            return "closing"
+        return "ready" if self.fresh else "running"
+
+    @property
+    def failed(self) -> bool:
+        """Whether the reply awaited will never come, or has not come in time.
+
+        Always False without timeouts, the simulator is then trusted to reply.
+        """
+        timeout = self.init_timeout if self.starting else self.request_timeout
+        if timeout is None:
+            return False
+        return not self.alive or time.perf_counter() - self._sent_at > timeout
+
+    def start(self, scenario: str, num_players: int, key: tuple) -> None:
+        """Spawns the simulator (or opens the session) and sends the Init request.
+
+        Non-blocking, the Init reply must be awaited with `wait_ready`.
+        """
+        exec_uuid = uuid.uuid4()
+        self.uuid = exec_uuid
+        self.started_at = time.perf_counter()
+
+        scenario = scenario.replace("!EXEC_UUID!", str(exec_uuid))
+
+        # running the underlying simulator process
+        if self.hosted:
+            # the process is already running (see SessionHost)
+            self._session_open = True
+            self.logger.info(f"Opening session #{self.session} at {self.endpoint}")
+        elif self.use_docker:
+            # inside docker
+            if self.allocator is None and not is_port_free(self.docker_port):
+                # a claimed port is free (see EndpointAllocator), not this one
+                raise RuntimeError(
+                    f"Host port {self.docker_port} of instance #{self.sim_id} is in"
+                    " use (allocate_endpoint claims a free one)"
+                )
+            args = f"--id={self.sim_id}"
+            if self.allocator is not None:
+                args += f" --endpoint=tcp://*:{DOCKER_CONTAINER_PORT}"
+            self.node = Popen(
+                f"docker run -it -v {self.base_path}:/home/asa/workspace -p {self.docker_port}:{DOCKER_CONTAINER_PORT} hub.asa.dcta.mil.br/asa/gym:latest ./AsaGym {args}",
+                shell=True,
+            )
+        else:
+            # or as a regular process
+            cwd_path = self.base_path.joinpath("./bin")
+            exe_path = self.base_path.joinpath("./bin/AsaWrapper.sh")
+
+            args = [
+                "bash",
+                exe_path,
+                "./AsaGym",
+                f"--id={self.sim_id}",
+                f"--uuid={exec_uuid}",
+            ]
+            if self.custom_endpoint:
+                args.append(f"--endpoint={self.endpoint}")
+
+            env = os.environ.copy()
+            self.node = Popen(
+                args,
+                stdout=DEVNULL,  # TODO: pipe this to somewhere
+                stderr=DEVNULL,  # TODO: pipe this to somewhere
+                cwd=cwd_path,
+                env=env,
+                shell=False,
+            )
+
+        if not self.hosted:
+            self.logger.info(
+                f"Spawning simulation instance #{self.sim_id} at {self.endpoint}"
+            )
+
+        # sending the Init request (always with the legacy envelope)
+        self.wire_format = pb.ANY
+        request = pb.InitRequest()
+        request.edl = scenario
+        request.num_players = num_players
+        request.wire_format = self.preferred_wire_format
+        request.packed_states = self.packed_states
+        request.delta_states = self.delta_states
+        if self.state_mask is not None:
+            request.state_mask.CopyFrom(self.state_mask)
+        send_message_to_simulation(self.socket, request, session=self.session)
+        self._sent_at = self.started_at
+        self.pending = True
+
+        self.scenario = key
+        self.starting = True
+        self.fresh = True
+
+    def wait_ready(self, timeout: Optional[float] = None) -> float:
+        """Blocks until the simulator replies the Init request.
+
+        Returns the cold-start time, in seconds since `start`. Raises a
+        TimeoutError if the simulator is not ready `timeout` seconds after
+        `start`, or a SimulatorFailure if it has exited by then (the request is
+        still in flight in both cases, see `reap`).
+        """
+        if timeout is not None:
+            remaining = self.started_at + timeout - time.perf_counter()
+            if self.socket.poll(max(int(remaining * 1000), 0), zmq.POLLIN) == 0:
+                if not self.alive:
+                    raise SimulatorFailure(
+                        f"Instance #{self.sim_id} exited before being ready"
+                    )
+                raise TimeoutError(
+                    f"Instance #{self.sim_id} not ready after {timeout:.1f} s"
+                )
+
+        reply = recv_message_from_simulation(self.socket, pb.INIT, session=self.session)
+        self.starting = False
+        self.pending = False
+        self.cold_start = time.perf_counter() - self.started_at
+        self.wire_format = reply.wire_format
+        if self.packed_states and len(reply.schema.player_fields) > 0:
+            self.schema = reply.schema
+        self.delta = self.delta_states and reply.delta_states
+        wire_format = pb.WireFormat.Name(self.wire_format)
+        self.logger.debug(f"Instance #{self.sim_id} wire format: {wire_format}")
+        self.logger.info(
+            f"Instance #{self.sim_id} ready after {self.cold_start:.3f} s"
+        )
+        return self.cold_start
+
+    def send(self, message: Message) -> None:
+        self.socket.send(
+            encode_request(message, self.wire_format, session=self.session)
+        )
+        self._sent_at = time.perf_counter()
+        self.pending = True
+
+    def recv(
+        self, msg_type: pb.INIT | pb.CLOSE | pb.STEP | pb.RESET | pb.SYNC
+    ) -> (
+        pb.InitResponse
+        | pb.ResetResponse
+        | pb.StepResponse
+        | pb.CloseResponse
+        | pb.SyncResponse
+    ):
+        if self.request_timeout is not None:
+            self._await_reply()
+        frame = self.socket.recv(copy=False)
+        self.pending = False
+        self.bytes_received += len(frame.buffer)
+        self.messages_received += 1
+        return decode_response(
+            frame.buffer, msg_type, self.wire_format, session=self.session
+        )
+
+    def _await_reply(self) -> None:
+        # polls in slices, to notice a simulator that has exited in between
+        while self.socket.poll(WATCHDOG_INTERVAL_MS, zmq.POLLIN) == 0:
+            if not self.alive:
+                raise SimulatorFailure(f"Instance #{self.sim_id} has exited")
+            if time.perf_counter() - self._sent_at > self.request_timeout:
+                raise SimulatorFailure(
+                    f"Instance #{self.sim_id} has not replied within "
+                    f"{self.request_timeout:.1f} s"
+                )
+
+    async def wait_readable(self) -> None:
+        """Waits for the next reply (or a failure) without blocking the event loop."""
+        if self._async_socket is None:
+            self._async_socket = zmq.asyncio.Socket.from_socket(self.socket)
+        if self.request_timeout is None and self.init_timeout is None:
+            await self._async_socket.poll(flags=zmq.POLLIN)
+            return
+
+        while await self._async_socket.poll(WATCHDOG_INTERVAL_MS, zmq.POLLIN) == 0:
+            if self.failed:
+                # the failure is raised by the read of the reply
+                return
+
+    def stop(self, timeout: float = CLOSE_TIMEOUT) -> None:
+        """Closes the simulator (or its session) gracefully, see `shutdown`."""
+        shutdown([self], timeout)
+
+    def stop_flow(
+        self, timeout: float = CLOSE_TIMEOUT
+    ) -> Generator[None, None, None]:
+        """Same as `stop`, but yielding while the Close reply is awaited on `socket`.
+
+        Once it has replied (or `timeout` seconds after the request), the
+        simulator is reaped rather than waited for: it has nothing left to do
+        but exit.
+        """
+        deadline = time.perf_counter() + timeout
+        self.request_close()
+        if self.closing:
+            yield
+            # polls in slices, to notice a simulator that has exited in between
+            while self.socket.poll(WATCHDOG_INTERVAL_MS, zmq.POLLIN) == 0:
+                if not self.alive or time.perf_counter() > deadline:
+                    name = f"Instance #{self.sim_id}"
+                    self.logger.warning(f"{name} has not replied Close")
+                    break
+            else:
+                self.recv_close()
+        self.reap()
+
+    def request_close(self) -> None:
+        """Sends the Close request, if the simulator can reply it.
+
+        Non-blocking, the reply is read by `recv_close`.
+        """
+        if self.pending or not self.alive:
+            # a reply is awaited first (or will never come)
+            return
+        self.send(pb.CloseRequest())
+        self.closing = True
+
+    def recv_close(self) -> None:
+        self.recv(pb.CLOSE)
+        self.closing = False
+
+    def reap(self) -> None:
+        """Kills the process if it is still running, and forgets the simulator.
+
+        A request still in flight is dropped along with the socket (which is
+        replaced), as for a simulator that has failed. A hosted session is only
+        forgotten, its process is left to its host.
+        """
+        if self.node is not None:
+            # does nothing if the process has already exited
+            self.node.kill()
+            self.node.wait(timeout=10.0)
+            self.node = None
+
+        if self.pending:
+            # the reply will never be read
+            self.reconnect()
+
+        self._session_open = False
+        self.closing = False
+        self.scenario = None
+        self.fresh = False
+
+    def reconnect(self) -> None:
+        """Replaces the socket, dropping the request in flight (if any)."""
+        if self._async_socket is not None:
+            self._async_socket.close(linger=0)
+            self._async_socket = None
+        self.socket.close(linger=0)
+
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.connect(self.endpoint)
+        self.starting = False
+        self.closing = False
+        self.pending = False
+
+    def close(self) -> None:
+        if self.running:
+            self.stop()
+        # requests still in flight must not block the termination of the context
+        if self._async_socket is not None:
+            # also stops watching the socket on the event loop
+            self._async_socket.close(linger=0)
+        self.socket.close(linger=0)
+
+        if self.allocator is not None:
+            self.allocator.release(self.endpoint)
+
+
+def shutdown(
+    instances: Sequence[SimulatorInstance], timeout: float = CLOSE_TIMEOUT
+) -> None:
+    """Stops many simulators at once, gracefully whenever possible.
+
+    Every running simulator is sent a Close request before any reply is
+    awaited, so that they all save their recordings and exit in parallel. The
+    processes still running `timeout` seconds later are terminated (SIGTERM),
+    and killed if they have not exited TERMINATE_GRACE seconds after that.
+    Hosted sessions are only closed, their process is left to its host.
+    """
+    instances = [instance for instance in instances if instance.running]
+    for instance in instances:
+        instance.request_close()
+
+    # the others (awaiting another reply, or already exited) are not waited for
+    graceful = [instance for instance in instances if instance.closing]
+
+    deadline = time.perf_counter() + timeout
+    poller = zmq.Poller()
+    closing = {}  # socket => instance awaiting the Close reply
+    for instance in graceful:
+        closing[instance.socket] = instance
+        poller.register(instance.socket, zmq.POLLIN)
+
+    while len(closing) > 0 and time.perf_counter() < deadline:
+        for socket, _ in poller.poll(WATCHDOG_INTERVAL_MS):
+            poller.unregister(socket)
+            closing.pop(socket).recv_close()
+
+        for socket, instance in list(closing.items()):
+            if not instance.alive:
+                # exited without replying
+                poller.unregister(socket)
+                del closing[socket]
+
+    for instance in closing.values():
+        instance.logger.warning(f"Instance #{instance.sim_id} has not replied Close")
+
+    # the processes exit on their own once they have replied
+    _wait_exits(graceful, deadline)
+    for instance in instances:
+        if instance.alive and not instance.hosted:
+            instance.logger.warning(f"Terminating instance #{instance.sim_id}")
+            instance.node.terminate()
+
+    _wait_exits(instances, time.perf_counter() + TERMINATE_GRACE)
+    for instance in instances:
+        if instance.alive and not instance.hosted:
+            instance.logger.warning(f"Killing instance #{instance.sim_id}")
+        instance.reap()
+
+
+def _wait_exits(instances: Sequence[SimulatorInstance], deadline: float) -> None:
+    # polls the processes, which may not be waited for all at once
+    running = [i.node for i in instances if i.alive and not i.hosted]
+    while len(running) > 0 and time.perf_counter() < deadline:
+        time.sleep(WATCHDOG_INTERVAL_MS / 1000)
+        running = [node for node in running if node.poll() is None]
+
+
+class SessionHost:
+    """A simulator process hosting many independent sessions behind one socket.
+
+    Environments reach their session with `endpoint=host.endpoint` and
+    `session=k` (for k in range(num_sessions)), so that they share the process,
+    along with its scenario, models and terrain data. The process outlives the
+    episodes of the sessions, until the host is closed.
+
+    The command defaults to AsaGym, any other simulator implementing the session
+    protocol may be given (e.g. asagym.utils.standin).
+    """
+
+    def __init__(
+        self,
+        base_path: pathlib.Path,
+        num_sessions: int,
+        sim_id: int = 0,
+        endpoint: Optional[str] = None,
+        command: Optional[List[str]] = None,
+        logger: Optional[Logger] = None,
+    ):
+        self.base_path = base_path
+        self.num_sessions = num_sessions
+        self.sim_id = sim_id
+        self.endpoint = resolve_endpoint(endpoint, base_path, sim_id)
+        self.logger = logger or getLogger(__name__)
+
+        exe_path = self.base_path.joinpath("./bin/AsaWrapper.sh")
+        self.command = command or ["bash", str(exe_path), "./AsaGym"]
+        self.node: Optional[Popen] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.node is not None and self.node.poll() is None
+
+    def start(self) -> None:
+        """Spawns the simulator process, the sessions are opened by their Init."""
+        args = self.command + [
+            f"--id={self.sim_id}",
+            f"--endpoint={self.endpoint}",
+            f"--sessions={self.num_sessions}",
+        ]
+        self.node = Popen(
+            args,
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            cwd=self.base_path.joinpath("./bin"),
+            env=os.environ.copy(),
+            shell=False,
+        )
+        self.logger.info(
+            f"Spawning simulator #{self.sim_id} with {self.num_sessions} sessions "
+            f"at {self.endpoint}"
+        )
+
+    def close(self) -> None:
+        """Terminates the process (its sessions must have been closed before)."""
+        if self.node is not None:
+            self.node.terminate()
+            try:
+                self.node.wait(timeout=TERMINATE_GRACE)
+            except TimeoutExpired:
+                self.logger.warning(f"Killing simulator #{self.sim_id}")
+                self.node.kill()
+                self.node.wait(timeout=10.0)
+            self.node = None
+
+    def __enter__(self) -> "SessionHost":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> bool:
+        self.close()
+        return False
+
+
+class StandbyPool:
+    """Pre-initialized simulator instances started in background threads.
+
+    Every instance of the pool (and the one in use by the environment) owns one
+    of `size + 1` ids, so that no two running instances share the same port.
+    The ids are `rank + k * STANDBY_ID_STRIDE`, which requires the ranks of all
+    the environments to be below STANDBY_ID_STRIDE.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        rank: int,
+        factory: Callable[[int], SimulatorInstance],
+        logger: Logger,
+    ):
+        if not 0 <= rank < STANDBY_ID_STRIDE:
+            # its ids would be those of other ranks
+            raise ValueError(f"The rank must be below {STANDBY_ID_STRIDE}")
+
+        self.size = size
+        self.logger = logger
+        self._factory = factory
+        self._closing = False
+
+        self._free_ids: Queue = Queue()
+        for idx in range(1, size + 1):
+            self._free_ids.put(rank + idx * STANDBY_ID_STRIDE)
+
+        self._standby: Deque[Tuple[tuple, Future]] = deque()
+        self._executor = ThreadPoolExecutor(
+            max_workers=size + 1, thread_name_prefix=f"asagym-standby-{rank}"
+        )
+
+    def fill(self, scenario: str, num_players: int, key: tuple) -> None:
+        """Starts new standby instances in background until the pool is full."""
+        while len(self._standby) < self.size:
+            future = self._executor.submit(
+                self._prepare, scenario, num_players, key
+            )
+            self._standby.append((key, future))
+
+    def take(self, key: tuple) -> Optional[SimulatorInstance]:
+        """Takes a ready (or the soonest to be ready) instance of the given scenario.
+
+        Instances that failed (e.g. not ready within their `init_timeout`) or were
+        prepared for other scenarios are discarded. Returns None if none is left,
+        the caller starting a new instance instead.
+        """
+        flow = self.take_flow(key)
+        try:
+            while True:
+                next(flow)
+        except StopIteration as stop:
+            return stop.value
+
+    def take_flow(
+        self, key: tuple
+    ) -> Generator[Future, None, Optional[SimulatorInstance]]:
+        """The steps of `take`, yielding the instances still being prepared.
+
+        The future of such an instance is yielded before its result is read, so
+        that it can be awaited without blocking (e.g. on an event loop). The
+        discarded instances are closed in background.
+        """
+        while len(self._standby) > 0:
+            standby_key, future = self._standby.popleft()
+            if not future.done():
+                yield future
+            try:
+                instance = future.result()
+            except Exception as e:
+                self.logger.warning(f"Discarding failed standby instance: {e}")
+                continue
+
+            if standby_key == key and instance.alive:
+                self.logger.info(f"Using standby instance #{instance.sim_id}")
+                return instance
+
+            self._executor.submit(self.release, instance)
+        return None
+
+    def release(self, instance: SimulatorInstance) -> None:
+        """Closes an instance that is no longer in use, freeing its id."""
+        instance.close()
+        self._free_ids.put(instance.sim_id)
+
+    def close(self) -> None:
+        # the instances still being prepared give up (see _prepare), so that
+        # none is waited for beyond WATCHDOG_INTERVAL_MS
+        self._closing = True
+        instances = []
+        while len(self._standby) > 0:
+            _, future = self._standby.popleft()
+            try:
+                instances.append(future.result())
+            except Exception:
+                pass
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        # the standby simulators are stopped at once
+        shutdown(instances)
+        for instance in instances:
+            self.release(instance)
+
+    def _prepare(self, scenario: str, num_players: int, key: tuple):
+        sim_id = self._free_ids.get()
+        instance = self._factory(sim_id)
+        if self._closing:
+            self.release(instance)
+            raise RuntimeError("standby pool is closing")
+
+        try:
+            instance.start(scenario, num_players, key)
+            # polls in slices, to give up as soon as the pool is closing
+            while instance.socket.poll(WATCHDOG_INTERVAL_MS, zmq.POLLIN) == 0:
+                if self._closing:
+                    raise RuntimeError("standby pool is closing")
+                if not instance.alive:
+                    raise SimulatorFailure(
+                        f"Instance #{instance.sim_id} exited before being ready"
+                    )
+                if instance.failed:
+                    # not ready within its init_timeout, raised by wait_ready
+                    break
+            # a hung simulator fails the standby, taking it starts a new one
+            instance.wait_ready(instance.init_timeout)
+        except Exception:
+            instance.reap()
+            self.release(instance)
+            raise
+        return instance
@@ -0,0 +1,359 @@
+"""A stand-in for AsaGym, flying simple kinematics, for tests and benchmarks.
+
+It speaks the same protocol (both wire formats, multi-tick steps and sessions)
+but ignores the scenario: the blue players (num_players of Init) fly the
+actions they are given, and the red ones fly straight ahead. Every player has
+the other team as foes. The episode ends after a fixed number of ticks, or
+when the fuel of every blue player runs out.
+
+The States of the red players are reported as in the N x M scenarios (see
+NMBeyondVisualRangeEnv), or omitted as in the BVR ones (whose opponents are
+not agents) with --blue-only.
+
+Packed and delta states are not supported (as allowed by Init), nor is the
+state mask (all fields are always sent).
+
+Usage: python -m asagym.utils.standin [--endpoint URL | --id N] [--sessions K]
+    [--opponents M] [--episode-ticks T] [--blue-only]
+
+Without --sessions, it behaves as a single AsaGym process (session 0, exiting
+on Close). With it, every session is opened by its own Init and closed by its
+own Close, until the process is killed.
+"""
+
+import argparse
+import logging
+import math
+import random
+from typing import Dict, List, Optional
+
+import zmq
+
+import asagym.proto.simulator_pb2 as pb
+from asagym.utils.communication import REQUEST_FIELDS
+
+TICK_SECONDS = 0.1
+GRAVITY = 9.81  # [m/s2]
+METERS_PER_DEGREE = 111_320.0
+CLIMB_RATE = 50.0  # [m/s]
+ACCELERATION = 5.0  # [m/s2]
+FUEL_FLOW = 0.5  # [lbs/tick]
+WEZ_MAX = 40_000.0  # [m]
+WEZ_NEZ = 15_000.0  # [m]
+
+# the replies of the requests to a session
+SESSION_REPLIES = {
+    "reset": pb.ResetResponse,
+    "step": pb.StepResponse,
+    "sync": pb.SyncResponse,
+}
+
+
+def _wrap_angle(angle: float) -> float:
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class _Player:
+    def __init__(self, id: int, side: pb.Side, latitude: float, longitude: float):
+        self.id = id
+        self.side = side
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = 8_000.0
+        self.heading = 90.0 if side == pb.BLUE else -90.0
+        self.airspeed = 250.0
+        self.fuel_amount = 5_000.0
+        self.num_msl = 4
+
+        # the last action (the reds keep this one)
+        self.action = pb.Action(
+            id=id,
+            heading=self.heading,
+            load_factor=3.0,
+            altitude=self.altitude,
+            airspeed=self.airspeed,
+        )
+
+    def tick(self) -> None:
+        action = self.action
+
+        # coordinated turn towards the commanded heading
+        load_factor = max(action.load_factor, 1.0)
+        rate = math.degrees(GRAVITY * math.sqrt(load_factor**2 - 1.0) / self.airspeed)
+        turn = _wrap_angle(action.heading - self.heading)
+        self.heading = _wrap_angle(
+            self.heading + max(-rate, min(rate, turn / TICK_SECONDS)) * TICK_SECONDS
+        )
+
+        climb = max(-CLIMB_RATE, min(CLIMB_RATE, action.altitude - self.altitude))
+        self.altitude = max(self.altitude + climb * TICK_SECONDS, 1.0)
+        accel = max(-ACCELERATION, min(ACCELERATION, action.airspeed - self.airspeed))
+        self.airspeed = max(self.airspeed + accel * TICK_SECONDS, 50.0)
+
+        distance = self.airspeed * TICK_SECONDS / METERS_PER_DEGREE
+        heading = math.radians(self.heading)
+        self.latitude += distance * math.cos(heading)
+        self.longitude += distance * math.sin(heading) / math.cos(
+            math.radians(self.latitude)
+        )
+        self.fuel_amount = max(self.fuel_amount - FUEL_FLOW, 0.0)
+
+    def fill(self, state: pb.PlayerState) -> None:
+        state.id = self.id
+        state.latitude = self.latitude
+        state.longitude = self.longitude
+        state.altitude = self.altitude
+        state.heading = self.heading
+        state.airspeed = self.airspeed
+
+
+class StandInSession:
+    """An independent simulation, as opened by an Init request."""
+
+    def __init__(
+        self,
+        num_players: int,
+        num_opponents: int,
+        episode_ticks: int,
+        opponent_states: bool = True,
+    ):
+        self.num_players = num_players
+        self.num_opponents = num_opponents
+        self.episode_ticks = episode_ticks
+        self.opponent_states = opponent_states  # whether the reds are reported
+        self.players: List[_Player] = []
+        self.ticks = 0
+
+    @property
+    def ended(self) -> bool:
+        blues = [p for p in self.players if p.side == pb.BLUE]
+        return self.ticks >= self.episode_ticks or all(
+            p.fuel_amount <= 0.0 for p in blues
+        )
+
+    def reset(self, seed: int) -> None:
+        rng = random.Random(seed)
+        self.ticks = 0
+        self.players = []
+        for idx in range(self.num_players + self.num_opponents):
+            blue = idx < self.num_players
+            self.players.append(
+                _Player(
+                    id=idx + 1,
+                    side=pb.BLUE if blue else pb.RED,
+                    latitude=-23.0 + rng.uniform(-0.05, 0.05),
+                    longitude=(-45.5 if blue else -45.0) + rng.uniform(-0.05, 0.05),
+                )
+            )
+
+    def act(self, actions: List[pb.Action]) -> None:
+        players = {p.id: p for p in self.players if p.side == pb.BLUE}
+        for action in actions:
+            if action.id in players:
+                players[action.id].action.CopyFrom(action)
+
+    def tick(self) -> None:
+        self.ticks += 1
+        for player in self.players:
+            player.tick()
+
+    def states(self) -> List[pb.State]:
+        ended = self.ended
+        states = []
+        for player in self.players:
+            if player.side == pb.RED and not self.opponent_states:
+                continue
+            state = pb.State(
+                id=player.id,
+                side=player.side,
+                exec_time=self.ticks * TICK_SECONDS,
+                active=True,
+            )
+            player.fill(state.owner.player_state)
+            state.owner.base_altitude = player.action.base_altitude
+            state.owner.fuel_amount = player.fuel_amount
+            state.owner.num_msl = player.num_msl
+            state.owner.tgt_id = -1
+            state.wing.tgt_id = -1
+
+            for foe in self.players:
+                if foe.side != player.side:
+                    self._fill_foe(player, foe, state.foes.add())
+
+            if ended:
+                state.end_of_episode = "break"
+            states.append(state)
+        return states
+
+    def _fill_foe(self, player: _Player, foe: _Player, state: pb.FoeState) -> None:
+        north = (foe.latitude - player.latitude) * METERS_PER_DEGREE
+        east = (
+            (foe.longitude - player.longitude)
+            * METERS_PER_DEGREE
+            * math.cos(math.radians(player.latitude))
+        )
+        foe.fill(state.player_state)
+        state.true_azmth = math.degrees(math.atan2(east, north))
+        state.rel_azmth = _wrap_angle(state.true_azmth - player.heading)
+        state.range = math.hypot(north, east)
+        state.wez_own2foe_max = WEZ_MAX
+        state.wez_own2foe_nez = WEZ_NEZ
+        state.wez_foe2own_max = WEZ_MAX
+        state.wez_foe2own_nez = WEZ_NEZ
+        state.is_active_emitter = True
+        state.emitter_mode = "scan"
+
+
+class StandInSimulator:
+    """Serves sessions on a ROUTER socket, in place of the AsaGym process."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        num_sessions: Optional[int] = None,
+        num_opponents: int = 1,
+        episode_ticks: int = 600,
+        opponent_states: bool = True,
+        context: Optional[zmq.Context] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.num_sessions = num_sessions
+        self.num_opponents = num_opponents
+        self.episode_ticks = episode_ticks
+        self.opponent_states = opponent_states
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.context = context or zmq.Context.instance()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.bind(endpoint)
+
+        self.sessions: Dict[int, StandInSession] = {}
+        # the wire format agreed with each client (socket), from Init to Close
+        self._formats: Dict[bytes, pb.WireFormat] = {}
+
+    def run(self) -> None:
+        """Serves requests until a Close (without sessions) or an interruption."""
+        try:
+            while True:
+                # the clients are REQ sockets (an empty delimiter frame)
+                identity, _, data = self.socket.recv_multipart()
+                reply, done = self.handle(identity, data)
+                self.socket.send_multipart([identity, b"", reply])
+                if done:
+                    return
+        except (KeyboardInterrupt, zmq.ContextTerminated):
+            pass
+        finally:
+            self.socket.close(linger=1000)
+
+    def handle(self, identity: bytes, data: bytes) -> tuple:
+        """Replies a request, returning the reply and whether to stop serving."""
+        wire_format = self._formats.get(identity, pb.ANY)
+        if wire_format == pb.ONEOF:
+            envelope = pb.Request.FromString(data)
+            field = envelope.WhichOneof("payload")
+            request = getattr(envelope, field)
+        else:
+            envelope = pb.RequestMessage.FromString(data)
+            name = envelope.payload.TypeName().split(".")[-1]
+            request = getattr(pb, name)()
+            envelope.payload.Unpack(request)
+            field = REQUEST_FIELDS[type(request)]
+
+        session_id = envelope.session
+        if self.num_sessions is not None and session_id >= self.num_sessions:
+            self.logger.warning(f"Session #{session_id} out of {self.num_sessions}")
+
+        reply = self._reply(session_id, field, request)
+        if field == "init":
+            # the Init reply goes in the legacy envelope, the rest in the new one
+            self._formats[identity] = request.wire_format
+        elif field == "close":
+            # the next Init (of a new session) comes in the legacy envelope
+            self._formats.pop(identity, None)
+
+        response = self._encode(reply, field, wire_format, session_id)
+        return response, field == "close" and self.num_sessions is None
+
+    def _reply(self, session_id: int, field: str, request):
+        if field == "init":
+            self.sessions[session_id] = StandInSession(
+                request.num_players,
+                self.num_opponents,
+                self.episode_ticks,
+                self.opponent_states,
+            )
+            self.logger.info(f"Session #{session_id} opened")
+            return pb.InitResponse(wire_format=request.wire_format)
+
+        if field == "close":
+            self.sessions.pop(session_id, None)
+            self.logger.info(f"Session #{session_id} closed")
+            return pb.CloseResponse()
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            # nothing to simulate, the reply is left empty
+            self.logger.error(f"Session #{session_id} not opened before {field}")
+            return SESSION_REPLIES[field]()
+
+        if field == "reset":
+            session.reset(request.seed)
+            return pb.ResetResponse(states=session.states())
+
+        if field == "sync":
+            return pb.SyncResponse(states=session.states())
+
+        # step, holding the actions for every tick
+        session.act(request.actions)
+        reply = pb.StepResponse()
+        num_ticks = max(request.num_ticks, 1)
+        for tick in range(num_ticks):
+            session.tick()
+            if tick == num_ticks - 1 or session.ended:
+                reply.states.extend(session.states())
+                reply.num_ticks = tick + 1
+                reply.done = tick < num_ticks - 1
+                return reply
+            reply.frames.add().states.extend(session.states())
+
+    def _encode(
+        self, reply, field: str, wire_format: pb.WireFormat, session_id: int
+    ) -> bytes:
+        if wire_format == pb.ONEOF:
+            # the reply goes in the field named after the one of the request
+            response = pb.Response(session=session_id)
+            getattr(response, field).CopyFrom(reply)
+        else:
+            response = pb.ResponseMessage(session=session_id)
+            response.payload.Pack(reply)
+        return response.SerializeToString()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", help="defaults to the one of AsaGym --id")
+    parser.add_argument("--id", type=int, default=0)
+    parser.add_argument("--uuid", help="ignored")
+    parser.add_argument("--sessions", type=int, help="host many sessions")
+    parser.add_argument("--opponents", type=int, default=1)
+    parser.add_argument("--episode-ticks", type=int, default=600)
+    parser.add_argument(
+        "--blue-only", action="store_true", help="omit the states of the reds"
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    endpoint = args.endpoint or f"tcp://127.0.0.1:{8000 + args.id}"
+    StandInSimulator(
+        endpoint,
+        num_sessions=args.sessions,
+        num_opponents=args.opponents,
+        episode_ticks=args.episode_ticks,
+        opponent_states=not args.blue_only,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from typing import Iterable
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.field_mask_pb2 import FieldMask
+
+import asagym.proto.simulator_pb2 as pb
+
+# the State fields read by BaseAsaEnv itself (ids, termination and rendering)
+BASE_STATE_FIELDS = (
+    "id",
+    "side",
+    "exec_time",
+    "active",
+    "end_of_episode",
+    "owner.player_state",
+)
+
+
+def _check_path(path: str) -> None:
+    descriptor = pb.State.DESCRIPTOR
+    for name in path.split("."):
+        if descriptor is None or name not in descriptor.fields_by_name:
+            raise ValueError(f"'{path}' is not a field of {pb.State.DESCRIPTOR.name}")
+        field = descriptor.fields_by_name[name]
+        # repeated messages (foes) are traversed, the path applies to every item
+        is_message = field.type == FieldDescriptor.TYPE_MESSAGE
+        descriptor = field.message_type if is_message else None
+
+
+def build_state_mask(paths: Iterable[str]) -> FieldMask:
+    """Builds the mask of the State fields to be replied by the simulator."""
+    mask = FieldMask()
+    for path in dict.fromkeys(paths):
+        _check_path(path)
+        mask.paths.append(path)
+    return mask
@@ -1,3 +1,5 @@
 from asagym.wrappers.relative_position import RelativePosition
 from asagym.wrappers.discrete_actions import DiscreteActions
 from asagym.wrappers.skip_frame import SkipFrameWrapper
+from asagym.wrappers.features import Feature, FeatureObservation
+from asagym.wrappers.state_recorder import StateRecorder
@@ -0,0 +1,223 @@
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import ObservationWrapper
+from gymnasium.spaces import Box, Dict, Space, Tuple as SpaceTuple
+
+
+class Feature:
+    """An entry of the vector built by FeatureObservation.
+
+    The value of the leaf at `path` (keys separated by dots, e.g.
+    "foe.player_state.latitude", with integers for the items of Tuples and the
+    elements of Boxes), minus the one at `relative_to` if given. It is scaled
+    from [low, high] to [-1, 1], the bounds defaulting to those of the Boxes;
+    unbounded features are left as they are.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        relative_to: Optional[str] = None,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+    ):
+        self.path = path
+        self.relative_to = relative_to
+        self.low = low
+        self.high = high
+
+    def __repr__(self) -> str:
+        relative = "" if self.relative_to is None else f" - {self.relative_to}"
+        return f"Feature({self.path}{relative})"
+
+
+FeatureSpec = Union[str, Tuple[str, str], Feature]
+
+
+def _split(path: str) -> List[Union[str, int]]:
+    return [int(name) if name.isdigit() else name for name in path.split(".")]
+
+
+class _Leaf:
+    # an element of the observation: where it is read and its bounds
+    def __init__(self, keys: Tuple[Union[str, int], ...], element: int, box: Box):
+        self.keys = keys  # of the Box, from the root of the observation
+        self.element = element  # in the flattened Box
+        self.low = float(box.low.flat[element])
+        self.high = float(box.high.flat[element])
+        self.offset = 0  # in the flattened observation
+
+    def read(self, observation: Any) -> float:
+        value = observation
+        for key in self.keys:
+            value = value[key]
+        if isinstance(value, np.ndarray):
+            return value.flat[self.element]
+        return value
+
+
+def _find_leaf(space: Space, path: str) -> _Leaf:
+    keys: List[Union[str, int]] = []
+    offset = 0
+    names = _split(path)
+    while len(names) > 0 and not isinstance(space, Box):
+        name = names.pop(0)
+        if isinstance(space, Dict):
+            items = list(space.spaces.items())
+        elif isinstance(space, SpaceTuple):
+            items = list(enumerate(space.spaces))
+        else:
+            raise ValueError(f"Only Boxes can be features, not {space} ({path})")
+
+        # the entries of the flattened space come in the order of the items
+        for key, subspace in items:
+            if key == name:
+                break
+            offset += gym.spaces.flatdim(subspace)
+        else:
+            raise KeyError(f"No {name} in the observation ({path})")
+        keys.append(name)
+        space = space[name]
+
+    if not isinstance(space, Box):
+        raise ValueError(f"Only Boxes can be features, not {space} ({path})")
+    if any(not isinstance(name, int) for name in names):
+        raise KeyError(f"Boxes only have elements ({path})")
+    if len(names) == 0 and space.shape not in ((), (1,)):
+        raise ValueError(f"The element of the Box must be given ({path})")
+
+    element = int(np.ravel_multi_index(names, space.shape)) if len(names) > 0 else 0
+    leaf = _Leaf(tuple(keys), element, space)
+    leaf.offset = offset + element
+    return leaf
+
+
+class FeatureObservation(ObservationWrapper):
+    """Builds a normalized vector of features from the observations, in one pass.
+
+    Fuses the usual chain of wrappers (RelativePosition, FlattenObservation and
+    a normalization) into a declarative list of features, e.g.
+
+        FeatureObservation(env, [
+            "owner.fuel_amount",
+            ("foe.player_state.latitude", "owner.player_state.latitude"),
+            Feature("foe.range", high=100_000.0),
+        ])
+
+    A string is a raw leaf and a pair a relative one (see Feature). Dict
+    observations (any nesting of Dicts and Tuples of Boxes) are read by key.
+    Flat ones are read by index, their entries being named after the leaves of
+    the `flat_layout_space` of the env (see BaseAsaEnv).
+
+    The vector is written into a reused buffer, with a few NumPy calls and
+    without allocations, and copied unless `copy` is False (in which case the
+    next step overwrites it).
+    """
+
+    def __init__(
+        self,
+        env: gym.Env,
+        features: Sequence[FeatureSpec],
+        dtype: np.dtype = np.float64,
+        copy: bool = True,
+    ):
+        super().__init__(env)
+        self.features = [self._feature(spec) for spec in features]
+        self.copy = copy
+
+        # the observations are flat if the env gives them as a Box
+        self._flat = isinstance(env.observation_space, Box)
+        space = env.observation_space
+        if self._flat:
+            space = getattr(env.unwrapped, "flat_layout_space", space)
+            if gym.spaces.flatdim(space) != env.observation_space.shape[0]:
+                raise ValueError("The layout of the flat observations is unknown")
+
+        # the distinct leaves read, the last entry of the source being zero (the
+        # one subtracted from raw features)
+        self._leaves: List[_Leaf] = []
+        minuends, subtrahends = [], []
+        lows, highs = [], []
+        for feature in self.features:
+            leaf = self._leaf(space, feature.path)
+            minuends.append(leaf)
+            if feature.relative_to is None:
+                subtrahends.append(None)
+                low, high = leaf.low, leaf.high
+            else:
+                other = self._leaf(space, feature.relative_to)
+                subtrahends.append(other)
+                low, high = leaf.low - other.high, leaf.high - other.low
+            lows.append(low if feature.low is None else feature.low)
+            highs.append(high if feature.high is None else feature.high)
+
+        size = env.observation_space.shape[0] if self._flat else len(self._leaves)
+        self._source = np.zeros((size + 1,), dtype=np.float64)
+        self._minuends = self._indexes(minuends, size)
+        self._subtrahends = self._indexes(subtrahends, size)
+
+        # x => (x - center) / half range, as x * scale + shift
+        low, high = np.array(lows), np.array(highs)
+        bounded = np.isfinite(low) & np.isfinite(high) & (high > low)
+        # (unbounded features as if in [-1, 1], unscaled)
+        low_, high_ = np.where(bounded, low, -1.0), np.where(bounded, high, 1.0)
+        half = (high_ - low_) / 2.0
+        center = (high_ + low_) / 2.0
+        self._scale = 1.0 / half
+        self._shift = -center / half
+
+        self._values = np.zeros((len(self.features),), dtype=np.float64)
+        self._other = np.zeros((len(self.features),), dtype=np.float64)
+        self._buffer = np.zeros((len(self.features),), dtype=dtype)
+        self.observation_space = Box(
+            low=np.where(bounded, -1.0, low).astype(dtype),
+            high=np.where(bounded, 1.0, high).astype(dtype),
+            dtype=dtype,
+        )
+
+    @staticmethod
+    def _feature(spec: FeatureSpec) -> Feature:
+        if isinstance(spec, Feature):
+            return spec
+        if isinstance(spec, str):
+            return Feature(spec)
+        return Feature(*spec)
+
+    def _leaf(self, space: Space, path: str) -> _Leaf:
+        leaf = _find_leaf(space, path)
+        for known in self._leaves:
+            if known.keys == leaf.keys and known.element == leaf.element:
+                return known
+        self._leaves.append(leaf)
+        return leaf
+
+    def _indexes(self, leaves: List[Optional[_Leaf]], zero: int) -> np.ndarray:
+        # the entries of the source holding the leaves (None being the zero one)
+        indexes = []
+        for leaf in leaves:
+            if leaf is None:
+                indexes.append(zero)
+            elif self._flat:
+                indexes.append(leaf.offset)
+            else:
+                indexes.append(self._leaves.index(leaf))
+        return np.array(indexes, dtype=np.intp)
+
+    def observation(self, observation: Any) -> np.ndarray:
+        source = self._source
+        if self._flat:
+            source[:-1] = observation
+        else:
+            for idx, leaf in enumerate(self._leaves):
+                source[idx] = leaf.read(observation)
+
+        values, other, buffer = self._values, self._other, self._buffer
+        np.take(source, self._minuends, out=values)
+        np.take(source, self._subtrahends, out=other)
+        values -= other
+        values *= self._scale
+        values += self._shift
+        buffer[:] = values
+        return buffer.copy() if self.copy else buffer
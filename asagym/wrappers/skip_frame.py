@@ -3,13 +3,38 @@ from gymnasium import Wrapper
 
 
 class SkipFrameWrapper(Wrapper):
+    """Repeats each action for `skip_count` frames, summing their rewards.
+
+    On ASA environments, the frames are simulated within a single step of the
+    env (by setting its `ticks_per_step`, see BaseAsaEnv), so the wrappers
+    between this one and the env see one step per decision rather than
+    `skip_count` steps: a TimeLimit below counts decisions, and so does the
+    "step_count" info. The env must then run one tick per step beforehand,
+    which also rules out wrapping it twice.
+    """
+
     def __init__(self, env, skip_count: int):
         super().__init__(env)
         self.skip_count = skip_count
 
+        # ASA environments simulate all the skipped frames within a single
+        # request to the simulator, accumulating the reward of every frame
+        self._multi_tick = hasattr(env.unwrapped, "ticks_per_step")
+        if self._multi_tick:
+            ticks_per_step = env.unwrapped.ticks_per_step
+            if ticks_per_step != 1:
+                raise ValueError(
+                    f"The env already runs {ticks_per_step} ticks per step "
+                    "(set by ticks_per_step or another SkipFrameWrapper)"
+                )
+            env.unwrapped.ticks_per_step = skip_count
+
     def step(
         self, action: Any
     ) -> tuple[Any, SupportsFloat, bool, bool, dict[str, Any]]:
+        if self._multi_tick:
+            return self.env.step(action)
+
         total_reward = 0
         for _ in range(1, 1 + self.skip_count):
             obs, reward, terminated, truncated, info = self.env.step(action)
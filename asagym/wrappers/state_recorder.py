@@ -0,0 +1,81 @@
+import os
+import pathlib
+from typing import Any, List, Optional, SupportsFloat
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import Wrapper
+
+from asagym.utils.records import StateRecords
+
+
+class StateRecorder(Wrapper):
+    """Records the States of every step as structured arrays (see StateRecords).
+
+    The States of the reset and of the last tick of each step are read from the
+    env (`last_states`, or its packed columns), as rebuilt from delta or packed
+    replies. The records of an episode are saved on its end (or on the next
+    reset, or on close) to `directory/episode-{n}.npz`, as `players` and `foes`
+    (those of every step, concatenated) along with `player_steps` and
+    `foe_steps` (the step of each record, 0 being the reset).
+    """
+
+    def __init__(self, env: gym.Env, directory: pathlib.Path):
+        super().__init__(env)
+        self.directory = directory
+        self.records = StateRecords()
+        self.episode_count = 0  # episodes saved
+
+        # the records of the steps of the current episode
+        self._players: List[np.ndarray] = []
+        self._foes: List[np.ndarray] = []
+
+        os.makedirs(directory, exist_ok=True)
+
+    def reset(
+        self, *, seed: Optional[int] = None, options: Optional[dict] = None
+    ) -> tuple[Any, dict[str, Any]]:
+        self._save()
+        observation, info = self.env.reset(seed=seed, options=options)
+        self._record()
+        return observation, info
+
+    def step(
+        self, action: Any
+    ) -> tuple[Any, SupportsFloat, bool, bool, dict[str, Any]]:
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self._record()
+        if terminated or truncated:
+            self._save()
+        return observation, reward, terminated, truncated, info
+
+    def close(self) -> None:
+        self._save()
+        super().close()
+
+    def _record(self) -> None:
+        env = self.env.unwrapped
+        if env.packed is not None and len(env.packed.players) > 0:
+            self.records.decode_columns(env.packed)
+        else:
+            self.records.decode(env.last_states)
+
+        # the records are overwritten by the next decode
+        self._players.append(self.records.players.copy())
+        self._foes.append(self.records.foes.copy())
+
+    def _save(self) -> None:
+        if len(self._players) == 0:
+            return
+
+        steps = np.arange(len(self._players))
+        np.savez(
+            self.directory.joinpath(f"episode-{self.episode_count}.npz"),
+            players=np.concatenate(self._players),
+            foes=np.concatenate(self._foes),
+            player_steps=np.repeat(steps, [len(p) for p in self._players]),
+            foe_steps=np.repeat(steps, [len(f) for f in self._foes]),
+        )
+        self.episode_count += 1
+        self._players.clear()
+        self._foes.clear()
@@ -0,0 +1,63 @@
+"""Compares the cold start of all simulators at once (start_fleet) and in turn.
+
+Usage: python cold_start.py <num_envs>
+"""
+
+import os
+import pathlib
+import sys
+import time
+
+from asagym.envs.fleet import start_fleet
+from asagym.envs.nmbvr import NMBeyondVisualRangeEnv
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = curr_path.joinpath("../../asa-ai/experiments/2x1_rlfighter_rlfighter.edl")
+num_envs = int(sys.argv[1])
+
+os.makedirs(data_path, exist_ok=True)
+
+
+def make_env(rank: int) -> NMBeyondVisualRangeEnv:
+    return NMBeyondVisualRangeEnv(
+        initialization=lambda: None,
+        reward=lambda env, states, done: 0.0,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=2,
+        num_opponents=1,
+        rank=rank,
+        use_docker=False,
+    )
+
+
+def measure_sequential() -> float:
+    envs = [make_env(rank) for rank in range(num_envs)]
+    try:
+        start = time.perf_counter()
+        for env in envs:
+            env.reset(seed=21)
+        return time.perf_counter() - start
+    finally:
+        for env in envs:
+            env.close()
+
+
+def measure_fleet() -> float:
+    envs = [make_env(rank) for rank in range(num_envs)]
+    try:
+        start = time.perf_counter()
+        report = start_fleet(envs)
+        for env in envs:
+            env.reset(seed=21)
+        print(f"[fleet] {report}")
+        return time.perf_counter() - start
+    finally:
+        for env in envs:
+            env.close()
+
+
+for name, measure in (("sequential", measure_sequential), ("fleet", measure_fleet)):
+    print(f"[{name}] {num_envs} envs | {measure():8.3f} s to the first observations")
@@ -0,0 +1,54 @@
+"""Compares the reset latency of cold (respawn) and warm (reuse) resets."""
+
+import os
+import pathlib
+import statistics
+import time
+
+import gymnasium
+
+import asagym  # noqa: F401
+from asagym.envs import random_reward_func
+
+NUM_RESETS = 20
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = curr_path.joinpath("../../asa-ai/experiments/2x1_rlfighter_rlfighter.edl")
+
+os.makedirs(data_path, exist_ok=True)
+
+
+def measure(warm_reset: bool) -> list:
+    deltas = []
+    with gymnasium.make(
+        "asagym:NMBeyondVisualRangeEnv-v0",
+        initialization=lambda: None,
+        reward=random_reward_func,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=2,
+        num_opponents=1,
+        rank=0,
+        use_docker=False,
+        warm_reset=warm_reset,
+    ) as env:
+        # the very first reset is always a cold one
+        env.reset(seed=21)
+        for _ in range(NUM_RESETS):
+            env.step(env.action_space.sample())
+            start = time.perf_counter()
+            env.reset(seed=21)
+            deltas.append(time.perf_counter() - start)
+    return deltas
+
+
+for name, warm_reset in (("cold", False), ("warm", True)):
+    deltas = measure(warm_reset)
+    print(
+        f"[{name}] resets: {len(deltas)} | "
+        f"mean: {statistics.mean(deltas) * 1e3:9.3f} ms | "
+        f"median: {statistics.median(deltas) * 1e3:9.3f} ms | "
+        f"max: {max(deltas) * 1e3:9.3f} ms"
+    )
@@ -0,0 +1,100 @@
+"""Measures the memory kept per step, with and without reused actions.
+
+Usage: python step_allocations.py <scenario.edl> <num_players> <num_opponents>
+
+The steady-state steps (after the warm-up) must neither keep Python objects
+(counted with sys.getallocatedblocks) nor grow the resident memory, which also
+accounts for the arenas of the protobuf messages (invisible to tracemalloc),
+otherwise the script fails. Linux only (the RSS is read from /proc).
+"""
+
+import gc
+import os
+import pathlib
+import sys
+
+import gymnasium
+
+import asagym  # noqa: F401
+from asagym.envs import random_reward_func
+
+NUM_WARMUP_STEPS = 500
+NUM_STEPS = 20_000
+MAX_BLOCKS_PER_STEP = 0.1
+MAX_RSS_BYTES_PER_STEP = 64.0
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = pathlib.Path(sys.argv[1]).absolute()
+num_players = int(sys.argv[2])
+num_opponents = int(sys.argv[3])
+
+os.makedirs(data_path, exist_ok=True)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+def usage() -> tuple:
+    gc.collect()
+    return sys.getallocatedblocks(), rss()
+
+
+def measure(reuse_actions: bool) -> tuple:
+    with gymnasium.make(
+        "asagym:NMBeyondVisualRangeEnv-v0",
+        initialization=lambda: None,
+        reward=random_reward_func,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=num_players,
+        num_opponents=num_opponents,
+        rank=0,
+        use_docker=False,
+        reuse_actions=reuse_actions,
+    ) as env:
+        # the same action on every step (sampling allocates)
+        action = env.action_space.sample()
+
+        env.reset(seed=21)
+        for _ in range(NUM_WARMUP_STEPS):
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset(seed=21)
+
+        blocks, memory = 0, 0
+        start = usage()
+        for _ in range(NUM_STEPS):
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                # the resets are not accounted
+                end = usage()
+                blocks += end[0] - start[0]
+                memory += end[1] - start[1]
+                env.reset(seed=21)
+                start = usage()
+        end = usage()
+        blocks += end[0] - start[0]
+        memory += end[1] - start[1]
+
+        return blocks / NUM_STEPS, memory / NUM_STEPS
+
+
+failed = []
+for name, reuse_actions in (("alloc", False), ("reuse", True)):
+    blocks, memory = measure(reuse_actions)
+    print(
+        f"[{name}] {num_players}x{num_opponents} | "
+        f"{blocks:8.3f} blocks kept/step | {memory:8.1f} RSS bytes/step"
+    )
+    if blocks > MAX_BLOCKS_PER_STEP:
+        failed.append(f"[{name}] steps keep {blocks:.3f} blocks/step")
+    if memory > MAX_RSS_BYTES_PER_STEP:
+        failed.append(f"[{name}] steps grow the RSS by {memory:.1f} bytes/step")
+if len(failed) > 0:
+    sys.exit("\n".join(failed))
@@ -0,0 +1,59 @@
+"""Compares the bytes received per step with full and delta encoded states.
+
+Usage: python step_bytes.py <scenario.edl> <num_players> <num_opponents>
+"""
+
+import os
+import pathlib
+import sys
+
+import gymnasium
+
+import asagym  # noqa: F401
+from asagym.envs import random_reward_func
+
+NUM_STEPS = 500
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = pathlib.Path(sys.argv[1]).absolute()
+num_players = int(sys.argv[2])
+num_opponents = int(sys.argv[3])
+
+os.makedirs(data_path, exist_ok=True)
+
+
+def measure(delta_states: bool) -> float:
+    with gymnasium.make(
+        "asagym:NMBeyondVisualRangeEnv-v0",
+        initialization=lambda: None,
+        reward=random_reward_func,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=num_players,
+        num_opponents=num_opponents,
+        rank=0,
+        use_docker=False,
+        delta_states=delta_states,
+    ) as env:
+        env.reset(seed=21)
+        instance = env.unwrapped._instance
+        start = instance.bytes_received
+        steps = 0
+        while steps < NUM_STEPS:
+            _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+            steps += 1
+            if terminated or truncated:
+                # the (full) Reset replies are not accounted
+                start -= instance.bytes_received
+                env.reset(seed=21)
+                start += instance.bytes_received
+        return (instance.bytes_received - start) / steps
+
+
+for name, delta_states in (("full", False), ("delta", True)):
+    print(
+        f"[{name}] {num_players}x{num_opponents} | "
+        f"{measure(delta_states):10.1f} bytes/step"
+    )
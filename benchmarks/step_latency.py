@@ -0,0 +1,55 @@
+"""Compares the per-step latency of the tcp and ipc transports."""
+
+import os
+import pathlib
+import statistics
+import time
+
+import gymnasium
+
+import asagym  # noqa: F401
+from asagym.envs import random_reward_func
+
+NUM_STEPS = 1_000
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = curr_path.joinpath("../../asa-ai/experiments/2x1_rlfighter_rlfighter.edl")
+
+os.makedirs(data_path, exist_ok=True)
+
+
+def measure(endpoint: str) -> list:
+    deltas = []
+    with gymnasium.make(
+        "asagym:NMBeyondVisualRangeEnv-v0",
+        initialization=lambda: None,
+        reward=random_reward_func,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=2,
+        num_opponents=1,
+        rank=0,
+        use_docker=False,
+        endpoint=endpoint,
+    ) as env:
+        env.reset(seed=21)
+        for _ in range(NUM_STEPS):
+            action = env.action_space.sample()
+            start = time.perf_counter()
+            _, _, terminated, truncated, _ = env.step(action)
+            deltas.append(time.perf_counter() - start)
+            if terminated or truncated:
+                env.reset(seed=21)
+    return deltas
+
+
+for endpoint in ("tcp", "ipc"):
+    deltas = measure(endpoint)
+    print(
+        f"[{endpoint}] steps: {len(deltas)} | "
+        f"mean: {statistics.mean(deltas) * 1e6:9.1f} us | "
+        f"median: {statistics.median(deltas) * 1e6:9.1f} us | "
+        f"p99: {statistics.quantiles(deltas, n=100)[-1] * 1e6:9.1f} us"
+    )
@@ -0,0 +1,68 @@
+"""Compares the steps per second of AsaVectorEnv and of stepping the envs in turn.
+
+Usage: python vector_throughput.py <num_envs>
+"""
+
+import os
+import pathlib
+import sys
+import time
+
+from asagym.envs.nmbvr import NMBeyondVisualRangeEnv
+from asagym.envs.vector import AsaVectorEnv
+
+NUM_STEPS = 1_000
+
+curr_path = pathlib.Path(__file__).parent.absolute()
+base_path = curr_path.joinpath("../../dist/")
+data_path = base_path.joinpath("./var/data/AsaGym")
+simu_path = curr_path.joinpath("../../asa-ai/experiments/2x1_rlfighter_rlfighter.edl")
+num_envs = int(sys.argv[1])
+
+os.makedirs(data_path, exist_ok=True)
+
+
+def make_env(rank: int):
+    return lambda: NMBeyondVisualRangeEnv(
+        initialization=lambda: None,
+        reward=lambda env, states, done: 0.0,
+        simu_path=simu_path,
+        base_path=base_path,
+        num_players=2,
+        num_opponents=1,
+        rank=rank,
+        use_docker=False,
+    )
+
+
+def measure_sequential() -> float:
+    envs = [make_env(rank)() for rank in range(num_envs)]
+    try:
+        for env in envs:
+            env.reset(seed=21)
+        start = time.perf_counter()
+        for _ in range(NUM_STEPS):
+            for env in envs:
+                _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+                if terminated or truncated:
+                    env.reset(seed=21)
+        return NUM_STEPS * num_envs / (time.perf_counter() - start)
+    finally:
+        for env in envs:
+            env.close()
+
+
+def measure_vector() -> float:
+    env = AsaVectorEnv([make_env(rank) for rank in range(num_envs)], copy=False)
+    try:
+        env.reset(seed=21)
+        start = time.perf_counter()
+        for _ in range(NUM_STEPS):
+            env.step(env.action_space.sample())
+        return NUM_STEPS * num_envs / (time.perf_counter() - start)
+    finally:
+        env.close()
+
+
+for name, measure in (("sequential", measure_sequential), ("vector", measure_vector)):
+    print(f"[{name}] {num_envs} envs | {measure():10.1f} steps/s")
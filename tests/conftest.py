@@ -0,0 +1,37 @@
+import pathlib
+import threading
+
+import pytest
+import zmq
+
+from asagym.utils.standin import StandInSimulator
+
+
+@pytest.fixture
+def scenario(tmp_path: pathlib.Path) -> pathlib.Path:
+    # the stand-in ignores the scenario, only its path is needed
+    path = tmp_path / "scenario.edl"
+    path.write_text("scenario !EXEC_UUID!\n")
+    return path
+
+
+@pytest.fixture
+def standin(tmp_path: pathlib.Path):
+    """Starts stand-in simulators in threads, returning their endpoints."""
+    context = zmq.Context()
+    threads = []
+
+    def start(**kwargs) -> str:
+        endpoint = f"ipc://{tmp_path}/standin-{len(threads)}.ipc"
+        simulator = StandInSimulator(endpoint, context=context, **kwargs)
+        thread = threading.Thread(target=simulator.run, daemon=True)
+        thread.start()
+        threads.append(thread)
+        return endpoint
+
+    yield start
+
+    # interrupts the simulators, which close their sockets
+    context.term()
+    for thread in threads:
+        thread.join(timeout=5)
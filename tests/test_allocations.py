@@ -0,0 +1,79 @@
+import gc
+import os
+import pathlib
+import sys
+import tracemalloc
+
+import pytest
+
+from asagym.envs.nmbvr import NMBeyondVisualRangeEnv
+from asagym.utils.simulator import SessionHost
+
+NUM_WARMUP_STEPS = 200
+NUM_STEPS = 2_000
+# the budget of a 2 x 2 step: the Python objects alive at its peak (the reply,
+# the States, the observation), and the ones kept by all the steps (a few
+# caches filled late, far from the NUM_STEPS blocks of a leak of one per step)
+MAX_PEAK_BYTES_PER_STEP = 16 * 1024
+MAX_BLOCKS_KEPT = 500
+
+ROOT_PATH = pathlib.Path(__file__).parents[1]
+
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    # the stand-in runs in its own process, so that only the env is measured
+    python_path = [str(ROOT_PATH)] + os.environ.get("PYTHONPATH", "").split(os.pathsep)
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(python_path))
+    tmp_path.joinpath("bin").mkdir()
+    command = [sys.executable, "-m", "asagym.utils.standin", "--opponents=2"]
+    with SessionHost(tmp_path, num_sessions=1, endpoint="ipc", command=command) as host:
+        yield host
+
+
+@pytest.mark.parametrize("reuse_actions", [False, True])
+def test_step_allocations(host, scenario, tmp_path, reuse_actions):
+    env = NMBeyondVisualRangeEnv(
+        num_players=2,
+        num_opponents=2,
+        reward=lambda env, states, done: 0.0,
+        initialization=lambda: None,
+        simu_path=scenario,
+        base_path=tmp_path,
+        endpoint=host.endpoint,
+        session=0,
+        init_timeout=30.0,
+        reuse_actions=reuse_actions,
+    )
+    try:
+        # the same action on every step (sampling allocates)
+        action = env.action_space.sample()
+
+        def step():
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset(seed=1)
+
+        env.reset(seed=1)
+        for _ in range(NUM_WARMUP_STEPS):
+            step()
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            peak = 0
+            blocks = sys.getallocatedblocks()
+            for _ in range(NUM_STEPS):
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                step()
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            gc.collect()
+            blocks = sys.getallocatedblocks() - blocks
+        finally:
+            tracemalloc.stop()
+    finally:
+        env.close()
+
+    assert peak <= MAX_PEAK_BYTES_PER_STEP
+    assert blocks <= MAX_BLOCKS_KEPT
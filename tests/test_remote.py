@@ -0,0 +1,152 @@
+import os
+import pathlib
+import sys
+import threading
+import time
+from subprocess import Popen
+
+import gymnasium as gym
+import numpy as np
+import pytest
+import zmq
+from gymnasium.spaces import Box
+
+from asagym.envs.remote import AsaRemoteVectorEnv
+from asagym.utils.broker import Broker
+
+TESTS_PATH = pathlib.Path(__file__).parent
+ROOT_PATH = TESTS_PATH.parent
+
+
+class CountingEnv(gym.Env):
+    """Observes its rank and its step count, sleeping the seconds of the action."""
+
+    def __init__(self, rank: int):
+        self.rank = rank
+        self.count = 0
+        self.observation_space = Box(low=0.0, high=np.inf, shape=(2,))
+        self.action_space = Box(low=0.0, high=10.0, shape=(1,))
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        self.count = 0
+        return self._observation(), {}
+
+    def step(self, action):
+        time.sleep(float(action[0]))
+        self.count += 1
+        return self._observation(), 1.0, False, False, {}
+
+    def _observation(self) -> np.ndarray:
+        return np.array([self.rank, self.count], dtype=np.float32)
+
+
+@pytest.fixture
+def broker(tmp_path):
+    context = zmq.Context()
+    frontend = f"ipc://{tmp_path}/frontend.ipc"
+    backend = f"ipc://{tmp_path}/backend.ipc"
+    thread = threading.Thread(
+        target=Broker(frontend, backend, context=context).run, daemon=True
+    )
+    thread.start()
+
+    yield frontend, backend
+
+    context.term()
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def workers(broker):
+    # two nodes of one slot each, on this machine
+    _, backend = broker
+    python_path = [str(ROOT_PATH), str(TESTS_PATH)]
+    python_path += os.environ.get("PYTHONPATH", "").split(os.pathsep)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(python_path))
+    nodes = [
+        Popen(
+            [sys.executable, "-m", "asagym.envs.remote", "--broker", backend]
+            + ["--env-fn", "test_remote:CountingEnv", f"--rank={rank}"],
+            env=env,
+        )
+        for rank in range(2)
+    ]
+
+    yield nodes
+
+    for node in nodes:
+        node.kill()
+        node.wait()
+
+
+def test_remote_vector_env(broker, workers):
+    frontend, _ = broker
+    env = AsaRemoteVectorEnv(frontend, 2, timeout=30.0)
+    try:
+        observations, _ = env.reset(seed=1)
+        assert sorted(observations[:, 0]) == [0.0, 1.0]
+        for count in range(1, 4):
+            observations, rewards, _, _, _ = env.step(np.zeros((2, 1)))
+            assert observations[:, 1].tolist() == [count, count]
+            assert rewards.tolist() == [1.0, 1.0]
+    finally:
+        env.close()
+
+
+def test_timeout_discards_replies(broker, workers):
+    frontend, _ = broker
+    env = AsaRemoteVectorEnv(frontend, 2, timeout=30.0)
+    try:
+        env.reset(seed=1)
+        env.timeout = 0.5
+        with pytest.raises(TimeoutError):
+            env.step(np.array([[0.0], [1.0]]))
+
+        # the late reply of the second slot is not taken for the next one
+        env.timeout = 30.0
+        observations, _, _, _, _ = env.step(np.zeros((2, 1)))
+        assert observations[:, 1].tolist() == [2.0, 2.0]
+    finally:
+        env.close()
+
+
+def test_worker_failure(broker, workers):
+    frontend, _ = broker
+    env = AsaRemoteVectorEnv(frontend, 2, timeout=30.0)
+    try:
+        observations, _ = env.reset(seed=1)
+        failed_rank = int(observations[1, 0])
+        workers[failed_rank].kill()
+
+        with pytest.raises(RuntimeError, match="heartbeats"):
+            env.step(np.zeros((2, 1)))
+        # without sending anything to the failed slot
+        with pytest.raises(RuntimeError, match="heartbeats"):
+            env.step(np.zeros((2, 1)))
+    finally:
+        env.close()
+
+    # the slot of the other worker is free again
+    env = AsaRemoteVectorEnv(frontend, 1, timeout=30.0)
+    try:
+        observations, _ = env.reset(seed=1)
+        assert observations[0, 0] == 1 - failed_rank
+    finally:
+        env.close()
+
+
+def test_lease(broker, workers):
+    frontend, _ = broker
+    env = AsaRemoteVectorEnv(frontend, 2, timeout=30.0, lease=1.0)
+    slots = env.slots
+    # the learner dies without detaching
+    env.socket.close(linger=0)
+    env.context.term()
+    env.closed = True
+
+    env = AsaRemoteVectorEnv(frontend, 2, timeout=30.0)
+    try:
+        assert sorted(env.slots) == sorted(slots)
+    finally:
+        env.close()
@@ -0,0 +1,101 @@
+import pytest
+
+import asagym.proto.simulator_pb2 as pb
+from asagym.envs.bvr import BeyondVisualRangeEnv
+from asagym.envs.nmbvr import NMBeyondVisualRangeEnv
+from asagym.utils.standin import StandInSession
+
+WIRE_FORMATS = [pytest.param(pb.ONEOF, id="oneof"), pytest.param(pb.ANY, id="any")]
+
+
+def make_nm_env(scenario, base_path, endpoint, session, **kwargs):
+    return NMBeyondVisualRangeEnv(
+        num_players=2,
+        num_opponents=1,
+        reward=lambda env, states, done: 1.0,
+        initialization=lambda: None,
+        simu_path=scenario,
+        base_path=base_path,
+        rank=session,
+        endpoint=endpoint,
+        session=session,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("opponent_states", [True, False])
+def test_session_states(opponent_states):
+    session = StandInSession(2, 1, episode_ticks=10, opponent_states=opponent_states)
+    session.reset(seed=1)
+
+    states = session.states()
+    ids = [state.owner.player_state.id for state in states]
+    assert ids == ([1, 2, 3] if opponent_states else [1, 2])
+    # the reds are the foes of the blues either way
+    assert [len(state.foes) for state in states[:2]] == [1, 1]
+
+
+@pytest.mark.parametrize("wire_format", WIRE_FORMATS)
+def test_sessions(standin, scenario, tmp_path, wire_format):
+    endpoint = standin(num_sessions=2, episode_ticks=4)
+    envs = [
+        make_nm_env(scenario, tmp_path, endpoint, k, wire_format=wire_format)
+        for k in range(2)
+    ]
+    try:
+        for env in envs:
+            obs, _ = env.reset(seed=1)
+            assert len(obs["allies"]) == 2 and len(obs["foes"]) == 1
+
+        # each session counts its own ticks
+        for _ in range(3):
+            assert not envs[0].step(envs[0].action_space.sample())[2]
+        assert not envs[1].step(envs[1].action_space.sample())[2]
+        assert envs[0].step(envs[0].action_space.sample())[2]
+        for _ in range(2):
+            assert not envs[1].step(envs[1].action_space.sample())[2]
+    finally:
+        for env in envs:
+            env.close()
+
+
+@pytest.mark.parametrize("wire_format", WIRE_FORMATS)
+def test_multi_tick_steps(standin, scenario, tmp_path, wire_format):
+    endpoint = standin(num_sessions=1, episode_ticks=7)
+    env = make_nm_env(
+        scenario, tmp_path, endpoint, 0, wire_format=wire_format, ticks_per_step=3
+    )
+    try:
+        env.reset(seed=1)
+        # one reward per tick
+        _, reward, terminated, _, _ = env.step(env.action_space.sample())
+        assert (reward, terminated) == (3.0, False)
+        _, reward, terminated, _, _ = env.step(env.action_space.sample())
+        assert (reward, terminated) == (3.0, False)
+        # the episode ends on the first tick of the third step
+        _, reward, terminated, _, _ = env.step(env.action_space.sample())
+        assert (reward, terminated) == (1.0, True)
+    finally:
+        env.close()
+
+
+@pytest.mark.parametrize("wire_format", WIRE_FORMATS)
+def test_bvr_blue_only(standin, scenario, tmp_path, wire_format):
+    endpoint = standin(num_sessions=1, opponent_states=False)
+    env = BeyondVisualRangeEnv(
+        reward=lambda state: state.owner.fuel_amount,
+        initialization=lambda: None,
+        simu_path=scenario,
+        base_path=tmp_path,
+        endpoint=endpoint,
+        session=0,
+        wire_format=wire_format,
+    )
+    try:
+        obs, _ = env.reset(seed=1)
+        assert obs["foe"]["player_state"]["heading"] == -90.0
+        obs, reward, terminated, _, _ = env.step(env.action_space.sample())
+        assert reward == obs["owner"]["fuel_amount"] > 0.0
+        assert not terminated
+    finally:
+        env.close()
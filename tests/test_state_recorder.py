@@ -0,0 +1,47 @@
+import numpy as np
+
+from asagym.envs.nmbvr import NMBeyondVisualRangeEnv
+from asagym.wrappers import StateRecorder
+
+
+def test_state_recorder(standin, scenario, tmp_path):
+    endpoint = standin(num_sessions=1, episode_ticks=5)
+    env = NMBeyondVisualRangeEnv(
+        num_players=2,
+        num_opponents=1,
+        reward=lambda env, states, done: 0.0,
+        initialization=lambda: None,
+        simu_path=scenario,
+        base_path=tmp_path,
+        endpoint=endpoint,
+        session=0,
+        ticks_per_step=2,
+    )
+    env = StateRecorder(env, tmp_path / "records")
+    try:
+        observations = [env.reset(seed=1)[0]]
+        terminated = False
+        while not terminated:
+            observation, _, terminated, _, _ = env.step(env.action_space.sample())
+            observations.append(observation)
+        # the next episode starts its own file
+        env.reset(seed=1)
+    finally:
+        env.close()
+
+    assert env.episode_count == 2
+    with np.load(tmp_path / "records" / "episode-0.npz") as episode:
+        players, foes = episode["players"], episode["foes"]
+        player_steps, foe_steps = episode["player_steps"], episode["foe_steps"]
+
+    # the reset and 3 steps (the last one ending on the 5th tick), 3 players
+    assert player_steps.tolist() == [0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+    blues = players[players["side"] == 0]
+    latitudes = [[ally["latitude"] for ally in obs["allies"]] for obs in observations]
+    assert np.array_equal(blues["owner.player_state.latitude"], np.ravel(latitudes))
+
+    # each blue reports the red, which reports both blues
+    assert len(foes) == 4 * 4
+    assert np.array_equal(np.unique(foe_steps, return_counts=True)[1], [4] * 4)
+    red = foes[foes["observer_id"] == 3]
+    assert red["player_state.id"].tolist() == [1, 2] * 4